@@ -0,0 +1,69 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Finds lang files in Minecraft's asset store. The asset index of a version is named in its version manifest (`versions/<v>/<v>.json`), and lists the hash of every asset, which is its path under `assets/objects`.
+
+Asset indexes are several megabytes, but only the `minecraft/lang/*` entries are needed, so they are kept as a small `locale -> hash` table, cached on disk by index mtime.
+'''
+
+from glob import glob
+from json import dumps, loads
+from os.path import basename, exists
+from re import compile
+
+from build_manifest import file_signature, write_atomic
+
+INDEX_CACHE = 'resourcepacks/crammese.indexes.json'
+LANG_OBJECT = compile(r'minecraft/lang/([^/]+)\.(?:json|lang)')
+
+_tables = {}
+
+
+def index_path(mc_home, version):
+    '''
+    Asset index of a version, following `inheritsFrom` of mod loader versions. Falls back to the highest numbered index if there's no version manifest.
+    '''
+    seen = set()
+    while version is not None and version not in seen and exists(f'{mc_home}/versions/{version}/{version}.json'):
+        seen.add(version)
+        manifest = loads(open(f'{mc_home}/versions/{version}/{version}.json', 'r', encoding='utf-8').read())
+        if 'assetIndex' in manifest:
+            return f'{mc_home}/assets/indexes/{manifest["assetIndex"]["id"]}.json'
+        version = manifest.get('inheritsFrom')
+
+    numbered = [int(basename(x).split('.')[0]) for x in glob(f'{mc_home}/assets/indexes/*.json') if basename(x).split('.')[0].isdigit()]
+    if not numbered:
+        raise FileNotFoundError(f'⛔ No asset index found in {mc_home}/assets/indexes')
+    return f'{mc_home}/assets/indexes/{max(numbered)}.json'
+
+
+def lang_hashes(mc_home, version, cache_path=INDEX_CACHE):
+    '''
+    `{locale: object hash}` of every lang file of the version.
+    '''
+    path = index_path(mc_home, version)
+    signature = file_signature(path)
+    if path in _tables and _tables[path][0] == signature:
+        return _tables[path][1]
+
+    cache = {}
+    if cache_path is not None and exists(cache_path):
+        cache = loads(open(cache_path, 'r', encoding='utf-8').read())
+    if cache.get(path, {}).get('signature') == signature:
+        table = cache[path]['lang']
+    else:
+        objects = loads(open(path, 'r', encoding='utf-8').read())['objects']
+        table = {}
+        for name, entry in objects.items():
+            match = LANG_OBJECT.fullmatch(name)
+            if match:
+                table[match.group(1).lower()] = entry['hash']
+        if cache_path is not None:
+            cache[path] = {'signature': signature, 'lang': table}
+            write_atomic(cache_path, dumps(cache))
+    _tables[path] = (signature, table)
+    return table
+
+
+def object_path(mc_home, hash):
+    return f'{mc_home}/assets/objects/{hash[:2]}/{hash}'
@@ -0,0 +1,207 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Benchmarks a full build on a fake install (see `fixture.py`). Each stage is timed on its own and reported in keys/sec:
+* index         resolving the asset index and reading the version jar
+* jars          discovering the mods and reading every lang file of their jars
+* transform     building each language from scratch
+* serialise     serialising each lang file
+* install       writing the zip, and copying the pack folder
+* total         `main.main()` end to end, with `--force`
+
+The lang files of the total run are checked against golden digests in `benchmarks/golden.json`, and every run is appended to `benchmarks/history.jsonl`, so stages that got slower than the best of the last runs are flagged.
+
+The build runs in a temporary copy of the repository, so the shipped lang files are left alone.
+
+Usage: python3 benchmarks/bench.py [--mods 20] [--keys 500] [--repeat 3] [--update-golden]
+'''
+
+from argparse import ArgumentParser
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timezone
+from hashlib import sha1
+from io import StringIO
+from json import dumps, loads
+from os import chdir, environ
+from os.path import exists
+from shutil import copytree, ignore_patterns, rmtree
+from subprocess import DEVNULL, check_output
+from sys import path
+from tempfile import mkdtemp
+from time import perf_counter
+from zipfile import ZipFile
+
+from fixture import REPO, make_fixture
+
+GOLDEN = f'{REPO}/benchmarks/golden.json'
+HISTORY = f'{REPO}/benchmarks/history.jsonl'
+REGRESSION = 0.2                                # Flag stages more than 20% slower than their best recent run
+RECENT_RUNS = 10
+
+
+class Stages:
+    def __init__(self):
+        self.seconds = {}
+        self.keys = {}
+
+    @contextmanager
+    def time(self, stage, keys=0):
+        start = perf_counter()
+        yield
+        self.seconds[stage] = self.seconds.get(stage, 0) + perf_counter() - start
+        self.keys[stage] = self.keys.get(stage, 0) + keys
+
+    def count(self, stage, keys):
+        self.keys[stage] = self.keys.get(stage, 0) + keys
+
+    def best(self, runs):
+        '''
+        Fastest time of every stage over several runs.
+        '''
+        best = Stages()
+        for run in runs:
+            for stage, seconds in run.seconds.items():
+                if stage not in best.seconds or seconds < best.seconds[stage]:
+                    best.seconds[stage] = seconds
+                    best.keys[stage] = run.keys[stage]
+        return best
+
+
+def prepare(tmp, mods, keys, seed):
+    '''
+    Writes the fixture, and imports `main` from a copy of the repository with `HOME` pointing at the fixture.
+    '''
+    home = f'{tmp}/home'
+    work = f'{tmp}/work'
+    make_fixture(home, mods, keys, seed)
+    copytree(REPO, work, ignore=ignore_patterns('.git', 'benchmarks', 'old', '__pycache__', 'crammese.*', '*.pickle'))
+    environ['HOME'] = home
+    chdir(work)
+    path.insert(0, work)
+    import main
+    return main
+
+
+def reset_caches(main):
+    '''
+    Drops what builds keep in memory for watch mode, so every run starts cold.
+    '''
+    import build_manifest
+    import key_categories
+    import knowledge_base
+    import mod_jars
+    from transform_cache import transform_cache
+
+    main._base.clear()
+    knowledge_base._opened.clear()
+    build_manifest._fragments.clear()
+    mod_jars._parsed.clear()
+    key_categories._categories.clear()
+    transform_cache.cache_clear()
+
+
+def run_stages(main, jobs):
+    from build_manifest import BuildManifest
+    from mod_jars import ModJarIndex
+    from pack_writer import serialise, write_pack_zip
+
+    reset_caches(main)
+    stages = Stages()
+    quiet = StringIO()
+    with redirect_stdout(quiet):
+        with stages.time('index'):
+            base = main.load_base()
+        stages.count('index', len(base[1]))
+
+        jars = ModJarIndex(f'{main.MC_MODS}/mods', cache_path=None)
+        with stages.time('jars'):
+            for mod, jar in jars.mods():
+                for locale in jars.locales(jar, mod):
+                    stages.count('jars', len(jars.read(jar, mod, locale, strip_comments=locale != 'en_us')))
+
+        manifest = BuildManifest('bench.manifest.json', 'bench.fragments', force=True)
+        members = {}
+        for LANG in main.LANGUAGES_TO_BE_PATCHED:
+            with stages.time(f'transform {LANG}'):
+                entry, data = main.build_language(LANG, jars, base, manifest)
+            out = loads(data)
+            stages.count(f'transform {LANG}', len(out))
+            with stages.time('serialise', len(out)):
+                members[main.lang_filename(LANG)] = serialise(out)
+        jars.close()
+
+        zip_path = f'{main.MC_MODS}/resourcepacks/crammese.zip'
+        with stages.time('install', sum(len(loads(data)) for data in members.values())):
+            rmtree(f'{main.MC_MODS}/resourcepacks', ignore_errors=True)
+            main.install_pack_folder()
+            write_pack_zip(zip_path, members)
+
+        reset_caches(main)
+        with stages.time('total', stages.keys['install']):
+            main.main(jobs, force=True)
+    with ZipFile(zip_path) as z:
+        digests = {name: sha1(z.read(name)).hexdigest() for name in z.namelist() if name.endswith('.json')}
+    return stages, digests
+
+
+def check_golden(config, digests, update):
+    golden = loads(open(GOLDEN, 'r', encoding='utf-8').read()) if exists(GOLDEN) else {}
+    if update or config not in golden:
+        golden[config] = digests
+        with open(GOLDEN, 'w', encoding='utf-8') as f:
+            f.write(dumps(golden, indent=2, sort_keys=True) + '\n')
+        return 'new'
+    mismatches = sorted(name for name in golden[config].keys() | digests.keys() if golden[config].get(name) != digests.get(name))
+    for name in mismatches:
+        print('⛔ Output differs from golden file:', name)
+    return 'mismatch' if mismatches else 'ok'
+
+
+def commit():
+    try:
+        return check_output(['git', '-C', REPO, 'rev-parse', '--short', 'HEAD'], stderr=DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def report(config, stages, golden):
+    previous = []
+    if exists(HISTORY):
+        previous = [run for run in map(loads, open(HISTORY, 'r', encoding='utf-8').read().splitlines()) if run['config'] == config][-RECENT_RUNS:]
+
+    print(f'{"stage":<20} {"seconds":>9} {"keys/sec":>12}')
+    for stage, seconds in stages.seconds.items():
+        rate = stages.keys[stage] / seconds if seconds else 0
+        best = min((run['seconds'][stage] for run in previous if stage in run['seconds']), default=None)
+        flag = f'⚠️ {seconds / best - 1:+.0%} vs. best of last {len(previous)}' if best and seconds > best * (1 + REGRESSION) else ''
+        print(f'{stage:<20} {seconds:>9.3f} {rate:>12,.0f} {flag}')
+    print('Golden files:', golden)
+
+    with open(HISTORY, 'a', encoding='utf-8') as f:
+        f.write(dumps({'date': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'commit': commit(), 'config': config,
+                       'seconds': stages.seconds, 'keys': stages.keys, 'golden': golden}) + '\n')
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--mods', type=int, default=20, help='number of mod jars in the fixture')
+    parser.add_argument('--keys', type=int, default=500, help='keys per locale of each mod')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jobs', type=int, default=1, help='processes of the total run')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage, the fastest counts')
+    parser.add_argument('--update-golden', action='store_true', help='accept the current output as golden')
+    parser.add_argument('--keep', action='store_true', help="don't delete the fixture")
+    args = parser.parse_args()
+
+    tmp = mkdtemp(prefix='crammese-bench-')
+    try:
+        main = prepare(tmp, args.mods, args.keys, args.seed)
+        runs = [run_stages(main, args.jobs) for _ in range(args.repeat)]
+        config = f'mods={args.mods} keys={args.keys} seed={args.seed}'
+        golden = check_golden(config, runs[0][1], args.update_golden)
+        report(config, Stages().best(stages for stages, _ in runs), golden)
+    finally:
+        chdir(REPO)
+        if args.keep:
+            print('🧪 Fixture kept in', tmp)
+        else:
+            rmtree(tmp)
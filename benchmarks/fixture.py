@@ -0,0 +1,108 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Fake CurseForge install for benchmarks, so `main.main()` can run without Minecraft.
+
+Builds `<home>/curseforge/minecraft/Install` (asset indexes, hashed lang objects, and `versions/<version>` with the version manifest and a jar with `en_us.json`) and `<home>/curseforge/minecraft/Instances/<version>/mods` with `mods` jars of `keys` keys per locale. The strings are taken back out of the shipped `cm_*.json`, so the fixture has Minecraft's real vocabulary, and everything is seeded, so the same arguments always give the same fixture.
+
+Usage: python3 benchmarks/fixture.py <home> [--mods 20] [--keys 500]
+'''
+
+from argparse import ArgumentParser
+from hashlib import sha1
+from json import dumps, loads
+from os import makedirs
+from os.path import abspath, dirname
+from random import Random
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+
+REPO = dirname(dirname(abspath(__file__)))
+SHIPPED = f'{REPO}/resourcepacks/crammese/assets/minecraft/lang'
+SHIPPED_FILES = {'fr_fr': 'cm_fr', 'es_es': 'cm_es', 'es_ar': 'cm_ar', 'ja_jp': 'cm_ja', 'de_de': 'cm_de'}
+MOD_LOCALES = ('fr_fr', 'es_es', 'es_mx', 'es_ar', 'ja_jp', 'de_de')
+KEY_PREFIXES = ('item', 'block', 'entity', 'biome', 'gui', 'tooltip')
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+FILLER_OBJECTS = 4000                           # Sounds, textures etc. of a real asset index
+
+
+def shipped_strings():
+    '''
+    `(en_us, {LANG: strings})` recovered from the shipped `cm_*.json`, whose values are `<foreign> / <English>`, or just the English.
+    '''
+    en_us = {}
+    langs = {}
+    for LANG, name in SHIPPED_FILES.items():
+        strings = loads(open(f'{SHIPPED}/{name}.json', 'r', encoding='utf-8').read())
+        langs[LANG] = {}
+        for k, v in strings.items():
+            foreign, _, english = v.partition(' / ')
+            english = english.replace('●', '%s') if english else foreign
+            en_us.setdefault(k, english)
+            langs[LANG][k] = foreign
+    return en_us, langs
+
+
+def _write_jar(path, files, filler=0):
+    with ZipFile(path, 'w', ZIP_DEFLATED) as z:
+        for name, content in files.items():
+            z.writestr(ZipInfo(name, ZIP_DATE), content)
+        for i in range(filler):
+            z.writestr(ZipInfo(f'com/example/Class{i}.class', ZIP_DATE), b'\xca\xfe\xba\xbe' + bytes(64))
+
+
+def make_fixture(home, mods=20, keys=500, seed=0, version='1.21', index=17):
+    '''
+    Writes the fake install to `home` and returns the number of keys in its mod jars.
+    '''
+    rnd = Random(seed)
+    install = f'{home}/curseforge/minecraft/Install'
+    instance = f'{home}/curseforge/minecraft/Instances/{version}'
+    makedirs(f'{install}/assets/indexes', exist_ok=True)
+    makedirs(f'{install}/versions/{version}', exist_ok=True)
+    makedirs(f'{instance}/mods', exist_ok=True)
+
+    en_us, langs = shipped_strings()
+
+    # Asset index with one hashed object per language. The version manifest names it, and a newer index of another version must not be picked.
+    objects = {f'minecraft/sounds/ambient/{i}.ogg': {'hash': sha1(str(i).encode()).hexdigest(), 'size': i} for i in range(FILLER_OBJECTS)}
+    for LANG, strings in langs.items():
+        data = dumps(strings, ensure_ascii=False, indent=2).encode('utf-8')
+        hash = sha1(data).hexdigest()
+        makedirs(f'{install}/assets/objects/{hash[:2]}', exist_ok=True)
+        with open(f'{install}/assets/objects/{hash[:2]}/{hash}', 'wb') as f:
+            f.write(data)
+        objects[f'minecraft/lang/{LANG}.json'] = {'hash': hash, 'size': len(data)}
+    for i in (index - 1, index, index + 1):
+        with open(f'{install}/assets/indexes/{i}.json', 'w', encoding='utf-8') as f:
+            f.write(dumps({'objects': objects if i == index else {}}))
+
+    with open(f'{install}/versions/{version}/{version}.json', 'w', encoding='utf-8') as f:
+        f.write(dumps({'id': version, 'assetIndex': {'id': str(index)}}))
+    _write_jar(f'{install}/versions/{version}/{version}.jar',
+               {'assets/minecraft/lang/en_us.json': dumps(en_us, ensure_ascii=False, indent=2)}, filler=200)
+
+    # Mod keys reuse vanilla strings that every language has, under the mod's namespace.
+    vanilla = sorted(k for k in en_us if all(k in strings for strings in langs.values()))
+    langs['es_mx'] = langs['es_es']
+    for i in range(mods):
+        namespace = f'mod{i:03d}'
+        sources = [rnd.choice(vanilla) for _ in range(keys)]
+        names = [f'{KEY_PREFIXES[j % len(KEY_PREFIXES)]}.{namespace}.{k.split(".")[-1]}_{j}' for j, k in enumerate(sources)]
+        files = {f'assets/{namespace}/lang/en_us.json': dumps({name: en_us[k] for name, k in zip(names, sources)}, indent=2)}
+        for locale in MOD_LOCALES:
+            if rnd.random() < 0.6:
+                files[f'assets/{namespace}/lang/{locale}.json'] = dumps(
+                    {name: langs[locale][k] for name, k in zip(names, sources)}, ensure_ascii=False, indent=2)
+        _write_jar(f'{instance}/mods/{namespace}-1.0.jar', files, filler=rnd.randrange(20, 200))
+    return mods * keys
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('home', help='fake home folder, e.g. /tmp/mchome')
+    parser.add_argument('--mods', type=int, default=20, help='number of mod jars')
+    parser.add_argument('--keys', type=int, default=500, help='keys per locale of each mod')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    make_fixture(args.home, args.mods, args.keys, args.seed)
+    print(f'🧪 Fixture written to {args.home}, run main.py with HOME={args.home}')
@@ -0,0 +1,90 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Build manifest for incremental rebuilds. For each output lang file it records the inputs it was built from (asset object hash, version jar, mod jar lang entries, knowledge base and rules version). The translated keys of vanilla and of each mod are cached as fragments named by the hash of their inputs, so only languages and mods whose inputs changed have to be rebuilt.
+'''
+
+from hashlib import sha1
+from json import dumps, loads
+from os import getpid, listdir, makedirs, remove, replace, stat
+from os.path import exists
+
+MANIFEST = 'resourcepacks/crammese.manifest.json'
+FRAGMENTS = 'resourcepacks/crammese.fragments'
+MANIFEST_VERSION = 2
+
+_fragments = {}                                 # digest -> fragment, fragments are immutable so they can be kept in memory across builds
+
+
+def file_signature(path):
+    if not exists(path):
+        return None
+    st = stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def digest(inputs):
+    return sha1(dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def write_atomic(path, content):
+    # Workers may write the same shared fragment at the same time.
+    tmp = f'{path}.{getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(content)
+    replace(tmp, path)
+
+
+class BuildManifest:
+    def __init__(self, path=MANIFEST, fragments=FRAGMENTS, force=False):
+        self.path = path
+        self.fragments = fragments
+        self.force = force                          # Rebuild everything, but still record the new inputs.
+        self.saved = set()                          # Fragments built by this build, reused even if forced, e.g. by other instances
+        self.languages = {}
+        if exists(path):
+            manifest = loads(open(path, 'r', encoding='utf-8').read())
+            if manifest.get('version') == MANIFEST_VERSION:
+                self.languages = manifest['languages']
+
+    def is_fresh(self, LANG, inputs, outfilename):
+        entry = self.languages.get(LANG)
+        return not self.force and entry is not None and entry['inputs'] == inputs and exists(outfilename)
+
+    def fragment_name(self, inputs):
+        return digest(dict(inputs, manifest=MANIFEST_VERSION))
+
+    def load_fragment(self, inputs):
+        '''
+        The cached fragment, shared between callers, don't modify it.
+        '''
+        name = self.fragment_name(inputs)
+        path = f'{self.fragments}/{name}.json'
+        if name in self.saved and name in _fragments:
+            return _fragments[name]
+        if self.force or not exists(path):
+            return None
+        if name not in _fragments:
+            _fragments[name] = loads(open(path, 'r', encoding='utf-8').read())
+        return _fragments[name]
+
+    def save_fragment(self, inputs, fragment):
+        makedirs(self.fragments, exist_ok=True)
+        name = self.fragment_name(inputs)
+        write_atomic(f'{self.fragments}/{name}.json', dumps(fragment))
+        _fragments[name] = fragment
+        self.saved.add(name)
+
+    def record(self, LANG, entry):
+        self.languages[LANG] = entry
+
+    def save(self):
+        write_atomic(self.path, dumps({'version': MANIFEST_VERSION, 'languages': self.languages}, indent=2))
+
+        # Drop fragments no language refers to anymore
+        if exists(self.fragments):
+            used = {name for entry in self.languages.values() for name in entry['fragments']}
+            for filename in listdir(self.fragments):
+                if filename.split('.')[0] not in used:
+                    remove(f'{self.fragments}/{filename}')
+                    _fragments.pop(filename.split('.')[0], None)
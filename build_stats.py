@@ -0,0 +1,141 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Counters of a build run, per language and per mod (vanilla counts as a mod): wall time, time and bytes spent reading lang files from jars, keys read, keys annotated, knowledge base hits and misses, and how often each rewrite rule fired. With `profile`, each language is also run under cProfile.
+
+Stats are off by default and then cost nothing but a few function calls per mod.
+'''
+
+from cProfile import Profile
+from collections import Counter
+from contextlib import contextmanager
+from io import StringIO
+from json import dumps
+from os import makedirs
+from pstats import Stats
+from time import perf_counter
+
+from rules import get_transformer
+
+PROFILES = 'resourcepacks/crammese.profile'
+PROFILE_LINES = 15
+COUNTERS = ('seconds', 'read_seconds', 'bytes_read', 'keys_read', 'keys_annotated', 'kb_hits', 'kb_misses')
+
+
+class CountingKnowledgeBase:
+    '''
+    Knowledge base that counts its hits and misses in the counters of the mod being built.
+    '''
+
+    def __init__(self, kbase, stats):
+        self.kbase = kbase
+        self.stats = stats
+
+    def get(self, word, default=None):
+        gender = self.kbase.get(word)
+        self.stats.count('kb_misses' if gender is None else 'kb_hits')
+        return default if gender is None else gender
+
+
+class BuildStats:
+    def __init__(self, enabled=False, profile=False):
+        self.enabled = enabled or profile
+        self.profile = profile
+        self.languages = {}
+        self.current = None
+
+    def language(self, LANG):
+        return self.languages.setdefault(LANG, {'seconds': 0, 'output_bytes': 0, 'mods': {}})
+
+    def count(self, counter, n=1):
+        if self.current is not None:
+            self.current[counter] += n
+
+    def knowledge_base(self, kbase):
+        return CountingKnowledgeBase(kbase, self) if self.enabled and kbase is not None else kbase
+
+    def output(self, LANG, data):
+        if self.enabled:
+            self.language(LANG)['output_bytes'] = len(data)
+
+    def transform_cache(self, LANG, cache):
+        if self.enabled:
+            self.language(LANG)['transform_cache'] = {'hits': cache.hits, 'misses': cache.misses, 'entries': len(cache.entries)}
+
+    def count_annotated(self, fragment, english):
+        if self.current is not None:
+            self.current['keys_annotated'] += sum(1 for k, v in fragment.items() if v != english.get(k))
+
+    @contextmanager
+    def measure(self, LANG, mod, jars=None):
+        '''
+        Collects the counters of one mod of a language. Reads from `jars` are attributed to it.
+        '''
+        if not self.enabled:
+            yield
+            return
+        counters = self.current = Counter({name: 0 for name in COUNTERS})
+        transformers = {t for t in (get_transformer(LANG, False), get_transformer(LANG, True)) if t is not None}
+        for transformer in transformers:
+            transformer.firings = Counter()
+        before = (jars.read_seconds, jars.bytes_read, jars.keys_read) if jars is not None else (0, 0, 0)
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            counters['seconds'] = perf_counter() - start
+            if jars is not None:
+                counters['read_seconds'] += jars.read_seconds - before[0]
+                counters['bytes_read'] += jars.bytes_read - before[1]
+                counters['keys_read'] += jars.keys_read - before[2]
+            rules = Counter()
+            for transformer in transformers:
+                rules.update({transformer.names[group]: n for group, n in transformer.firings.items()})
+                transformer.firings = None
+            self.language(LANG)['mods'][mod] = dict(counters, rules=dict(rules.most_common()))
+            self.current = None
+
+    @contextmanager
+    def measure_language(self, LANG):
+        '''
+        Wall time of a whole language, run under cProfile if profiling.
+        '''
+        if not self.enabled:
+            yield
+            return
+        profiler = Profile() if self.profile else None
+        start = perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            self.language(LANG)['seconds'] = perf_counter() - start
+            if profiler is not None:
+                makedirs(PROFILES, exist_ok=True)
+                profiler.dump_stats(f'{PROFILES}/{LANG}.prof')
+                text = StringIO()
+                Stats(profiler, stream=text).sort_stats('cumulative').print_stats(PROFILE_LINES)
+                print(f'⏱️ {LANG} profile, saved to {PROFILES}/{LANG}.prof:{text.getvalue()}')
+
+    def merge(self, languages):
+        self.languages.update(languages)
+
+    def report(self):
+        print(f'{"":<30} {"seconds":>8} {"read s":>8} {"bytes":>10} {"keys":>7} {"annotated":>9} {"kb hit":>7} {"kb miss":>7}')
+        for LANG, language in self.languages.items():
+            print(f'{LANG:<30} {language["seconds"]:>8.3f} {"":>8} {language["output_bytes"]:>10} (output)')
+            for mod, c in language['mods'].items():
+                print(f'  {mod:<28} {c["seconds"]:>8.3f} {c["read_seconds"]:>8.3f} {c["bytes_read"]:>10} {c["keys_read"]:>7} '
+                      f'{c["keys_annotated"]:>9} {c["kb_hits"]:>7} {c["kb_misses"]:>7}')
+            rules = Counter()
+            for c in language['mods'].values():
+                rules.update(c['rules'])
+            if rules:
+                print('  Rules fired:', ', '.join(f'{rule} ×{n}' for rule, n in rules.most_common(8)))
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(dumps({'languages': self.languages}, indent=2, ensure_ascii=False))
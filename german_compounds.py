@@ -0,0 +1,107 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Grammatical gender of German compound nouns. The last part of a compound (the head noun) decides its gender, e.g. Eichenholz|brett -> das Brett -> das Eichenholzbrett.
+
+Known words are stored reversed in a trie, so walking a compound from its last letter finds all known head nouns in O(word length). The longest head wins whose modifier is a known word, or a compound of known words, once the linking element is removed (Holz|bretter, Tannen|zapfen, Arbeit|s|tisch). Words whose modifier isn't known aren't split.
+
+Inflected colour adjectives aren't compounds, even though nominalised ones are in the knowledge base: `Hellblauer` is `hell` + `blau` + `-er`, not a `Blauer`.
+'''
+
+COMPOUNDS_VERSION = 2                           # Bump whenever splitting changes, so cached build outputs are invalidated.
+MIN_HEAD = 3                                    # Shorter "heads" are mostly endings, e.g. -ei, -er
+MIN_MODIFIER = 3
+LINKING_ELEMENTS = ('', 's', 'es', 'n', 'en', 'e', 'er', 'ns')
+ADJECTIVES = {'weiß', 'orange', 'magenta', 'hellblau', 'gelb', 'hellgrün', 'rosa', 'grau', 'hellgrau', 'türkis', 'violett', 'lila', 'blau',
+              'braun', 'grün', 'rot', 'schwarz', 'hell', 'dunkel', 'golden', 'roh', 'groß', 'klein', 'alt', 'neu', 'leer', 'glatt'}
+ADJECTIVE_ENDINGS = ('e', 'er', 'es', 'en', 'em')
+
+
+class HeadNounTrie:
+    def __init__(self, items):
+        self.root = {}
+        self.words = set()
+        for word, gender in items:
+            word = word.lower()
+            self.words.add(word)
+            node = self.root
+            for c in reversed(word):
+                node = node.setdefault(c, {})
+            node[None] = gender
+
+    def heads(self, word):
+        '''
+        `(length, gender)` of every known head noun of the word, longest first. The word itself doesn't count.
+        '''
+        word = word.lower()
+        heads = []
+        node = self.root
+        for i, c in enumerate(reversed(word[MIN_MODIFIER:])):
+            node = node.get(c)
+            if node is None:
+                break
+            if None in node and i + 1 >= MIN_HEAD:
+                heads.append((i + 1, node[None]))
+        return heads[::-1]
+
+    def _known(self, modifier):
+        '''
+        Whether the modifier is a known word or adjective, or a compound of them, once its linking element is removed.
+        '''
+        for linking in LINKING_ELEMENTS:
+            if modifier.endswith(linking):
+                stem = modifier[:len(modifier) - len(linking)]
+                if stem in self.words or stem in ADJECTIVES or self._split(stem) is not None:
+                    return True
+        return False
+
+    def _split(self, word):
+        for length, gender in self.heads(word):
+            if self._known(word[:-length]):
+                return gender
+        return None
+
+    def _inflected_adjective(self, word):
+        for ending in ADJECTIVE_ENDINGS:
+            if word.endswith(ending):
+                base = word[:-len(ending)]
+                if any(base.endswith(stem) and (base == stem or self._known(base[:-len(stem)])) for stem in ADJECTIVES):
+                    return True
+        return False
+
+    def gender(self, word):
+        '''
+        Gender of the longest known head noun of a compound with a known modifier, or `None`.
+        '''
+        word = word.lower()
+        if self._inflected_adjective(word):
+            return None
+        return self._split(word)
+
+
+class CompoundKnowledgeBase:
+    '''
+    Knowledge base that falls back to the head noun for compounds it doesn't know. The trie is only built on the first miss.
+    '''
+
+    def __init__(self, kbase):
+        self.kbase = kbase
+        self.trie = None
+
+    def get(self, word, default=None):
+        gender = self.kbase.get(word)
+        if gender is not None:
+            return gender
+        if self.trie is None:
+            self.trie = HeadNounTrie(self.kbase.items())
+        gender = self.trie.gender(word)
+        return default if gender is None else gender
+
+    def __contains__(self, word):
+        return self.get(word) is not None
+
+    def __len__(self):
+        return len(self.kbase)
+
+    def items(self):
+        return self.kbase.items()
@@ -0,0 +1,50 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+CurseForge instances, for building the pack of every instance in one run (`main.py --all-instances`).
+
+An instance is a folder of `~/curseforge/minecraft/Instances` with a `mods` folder. Its Minecraft version is read from the `minecraftinstance.json` CurseForge writes, and is the folder name for instances made by hand, e.g. `Instances/1.21`.
+'''
+
+from json import loads
+from os import listdir
+from os.path import basename, exists, expanduser, isdir
+from re import findall
+
+INSTANCES = expanduser('~/curseforge/minecraft/Instances')
+INSTANCE_MANIFEST = 'minecraftinstance.json'
+
+
+def instance_version(instance):
+    '''
+    Minecraft version of an instance, e.g. `1.20.6`.
+    '''
+    path = f'{instance}/{INSTANCE_MANIFEST}'
+    if exists(path):
+        try:
+            manifest = loads(open(path, 'r', encoding='utf-8-sig').read())
+        except ValueError as e:
+            print(f'⚠️ {path} is not valid JSON, guessing the version from the folder name:', e)
+            manifest = {}
+        version = manifest.get('gameVersion') or (manifest.get('baseModLoader') or {}).get('minecraftVersion')
+        if version:
+            return version
+    return basename(instance)
+
+
+def version_key(version):
+    '''
+    Sort key of a version, so that `1.20.6 < 1.21 < 1.21.1`.
+    '''
+    return tuple(int(x) for x in findall(r'\d+', version))
+
+
+def list_instances(folder=INSTANCES):
+    '''
+    `(instance folder, version)` of every instance with a `mods` folder, sorted by name.
+    '''
+    if not exists(folder):
+        return []
+    return [(f'{folder}/{name}', instance_version(f'{folder}/{name}'))
+            for name in sorted(listdir(folder))
+            if not name.startswith('.') and isdir(f'{folder}/{name}/mods')]
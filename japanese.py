@@ -0,0 +1,103 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Readings of Japanese strings with pykakasi, e.g. `オークの板材` -> `オークの板材 (ooku no itazai)`.
+
+pykakasi is slow per call, but Minecraft strings are made of the same few words (`の板材`, `の苗木`, colours...), so strings are split into tokens and each unique token is converted once, by one converter. Converted tokens are cached on disk, so a rerun only converts words that are new. Joining many strings into one pykakasi call is no faster, and its segments leak across the joins.
+
+Tokens are runs of katakana, and runs of kanji and hiragana split at the particle `の` between two words, which keeps okurigana with their kanji. pykakasi's segments of a token are its words, e.g. for the vocabulary index.
+'''
+
+from functools import lru_cache
+from json import dumps, loads
+from os import makedirs
+from os.path import dirname, exists
+from re import compile
+
+from pykakasi import kakasi
+
+from build_manifest import write_atomic
+
+CACHE = 'knowledgebase/.cache/japanese.json'
+READING = 'hepburn'                             # 'hepburn' for romaji, 'hira' for hiragana. Bump `rules.RULES_VERSION` when changing it.
+JAPANESE = compile(r'[ァ-ヺーぁ-ゖ㐀-鿿々〆ヶ]+')
+SCRIPT_RUN = compile(r'[ァ-ヺー]+|[ぁ-ゖ㐀-鿿々〆ヶ]+')
+NO_PARTICLE = compile(r'((?<=[^ぁ-ゖ])の(?=[^ぁ-ゖ]))')
+
+
+def split(japanese):
+    return [token for part in NO_PARTICLE.split(japanese) for token in SCRIPT_RUN.findall(part)]
+
+
+def tokens(text):
+    for japanese in JAPANESE.findall(text):
+        yield from split(japanese)
+
+
+class JapaneseReadings:
+    def __init__(self, cache_path=CACHE, style=READING):
+        self.cache_path = cache_path
+        self.style = style
+        self.separator = ' ' if style == 'hepburn' else ''
+        self.kakasi = None
+        self.tokens = {}                            # token -> {'hira': ..., 'hepburn': ...}
+        self.dirty = False
+        self.names = {'reading': 'reading'}         # Same stats interface as `rules.Transformer`
+        self.firings = None
+        if cache_path is not None and exists(cache_path):
+            self.tokens = loads(open(cache_path, 'r', encoding='utf-8').read())
+
+    def _convert(self, token):
+        if self.kakasi is None:
+            self.kakasi = kakasi()
+        segments = self.kakasi.convert(token)
+        self.dirty = True
+        return {'hira': ''.join(s['hira'] for s in segments), 'hepburn': ' '.join(s['hepburn'] for s in segments if s['hepburn']),
+                'words': [s['orig'] for s in segments]}
+
+    def prepare(self, values):
+        '''
+        Converts the tokens of many strings at once, and saves them to the cache.
+        '''
+        for token in sorted({token for value in values for token in tokens(value)} - self.tokens.keys()):
+            self.tokens[token] = self._convert(token)
+        self.save()
+
+    def _token(self, token):
+        if token not in self.tokens:
+            self.tokens[token] = self._convert(token)
+        return self.tokens[token][self.style]
+
+    def _words(self, token):
+        if 'words' not in self.tokens.get(token, {}):            # Cached before words were kept
+            self.tokens[token] = self._convert(token)
+        return self.tokens[token]['words']
+
+    def segment(self, text):
+        '''
+        Text with spaces between the words of its Japanese, e.g. `赤いネザーレンガ` -> ` 赤い ネザーレンガ `.
+        '''
+        return JAPANESE.sub(lambda m: f' {" ".join(word for token in split(m.group()) for word in self._words(token))} ', text)
+
+    def reading(self, text):
+        return JAPANESE.sub(lambda m: self.separator.join(self._token(token) for token in split(m.group())), text)
+
+    def __call__(self, text):
+        reading = self.reading(text)
+        if reading == text:
+            return text
+        if self.firings is not None:
+            self.firings['reading'] += 1
+        return f'{text} ({reading.replace("%s", "●")})'
+
+    def save(self):
+        if self.cache_path is None or not self.dirty:
+            return
+        makedirs(dirname(self.cache_path), exist_ok=True)
+        write_atomic(self.cache_path, dumps(self.tokens, ensure_ascii=False))
+        self.dirty = False
+
+
+@lru_cache(maxsize=None)
+def japanese_readings():
+    return JapaneseReadings()
@@ -0,0 +1,167 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Grammatical genders from kaikki.org, the machine-readable Wiktionary.
+
+Pages are fetched concurrently over a pooled session with retries, and every response is cached on disk by language and URL, so a rerun only fetches words that are new. `base_url` can point at a local stand-in server to test or benchmark offline.
+
+Without internet access, genders can instead be read from a local Wiktextract/kaikki.org JSONL dump (https://kaikki.org/dictionary/rawdata.html). The dump is streamed in chunks by several processes, so memory stays flat no matter how big it is.
+'''
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from gzip import open as gzip_open
+from hashlib import sha1
+from json import loads
+from os import cpu_count, makedirs, replace
+from os.path import exists, getsize
+from re import compile
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+KAIKKI_URL = 'https://kaikki.org/dictionary'
+CACHE_DIR = 'knowledgebase/.cache/kaikki'
+NOUN_PREFIX = '{"pos": "noun'
+WORD_FIELD = compile(rb'"word": "((?:[^"\\]|\\.)*)"')
+
+##################################################
+#    Tags
+##################################################
+def gender_from_tags(tags):
+    return 'p' if 'plural' in tags else (
+        'm' if 'masculine' in tags else ('n' if 'neuter' in tags else ('f' if 'feminine' in tags else None)))
+
+
+def gender_from_entries(lines):
+    '''
+    Gender of the first noun entry of a word, from the JSON lines of its kaikki page. Raises if there's no noun entry with tags.
+    '''
+    return gender_from_tags(loads([x for x in lines if x.startswith(NOUN_PREFIX)][0])['senses'][0]['tags'])
+
+##################################################
+#    Fetcher
+##################################################
+class KaikkiFetcher:
+    def __init__(self, lang_directory, base_url=KAIKKI_URL, cache_dir=CACHE_DIR, workers=16, timeout=10, retries=3):
+        self.lang_directory = lang_directory
+        self.base_url = base_url.rstrip('/')
+        self.cache_dir = f'{cache_dir}/{lang_directory}'
+        self.workers = workers
+        self.timeout = timeout
+
+        self.session = Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=Retry(
+            total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def url(self, word):
+        return f'{self.base_url}/{self.lang_directory}/meaning/{word[0]}/{word[:2]}/{word}.json'
+
+    def fetch(self, word):
+        '''
+        Noun entries of the word's page as JSON lines, an empty list if the page doesn't exist.
+        '''
+        url = self.url(word)
+        cached = f'{self.cache_dir}/{sha1(url.encode("utf-8")).hexdigest()}.jsonl'
+        if exists(cached):
+            return open(cached, 'r', encoding='utf-8').read().splitlines()
+
+        res = self.session.get(url, timeout=self.timeout)
+        if res.status_code == 404:
+            lines = []
+        else:
+            res.raise_for_status()
+            lines = [x for x in res.text.split('\n') if x.startswith(NOUN_PREFIX)]
+
+        # Only the noun entries are kept, the full pages are much bigger.
+        makedirs(self.cache_dir, exist_ok=True)
+        with open(f'{cached}.tmp', 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+        replace(f'{cached}.tmp', cached)
+        return lines
+
+    def gender(self, word):
+        try:
+            return word, gender_from_entries(self.fetch(word))
+        except Exception as e:
+            print('🚫', word, f'failed: {e}')
+            return word, None
+
+    def genders(self, words):
+        '''
+        `{word: gender}` of every word whose gender could be found.
+        '''
+        worddict = {}
+        with ThreadPoolExecutor(self.workers) as pool:
+            for word, gender in pool.map(self.gender, words):
+                if gender is not None:
+                    worddict[word] = gender
+        return worddict
+
+    def close(self):
+        self.session.close()
+
+##################################################
+#    Dump
+##################################################
+def _dump_chunks(path, count):
+    '''
+    `count` byte ranges of the dump, each starting at the beginning of a line.
+    '''
+    size = getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, count):
+            f.seek(size * i // count)
+            f.readline()
+            bounds.append(max(f.tell(), bounds[-1]))
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def _scan_dump(path, start, end, words):
+    '''
+    `{word: (offset, gender)}` of the first noun entry of every candidate word between `start` and `end`.
+    '''
+    noun_prefix = NOUN_PREFIX.encode('utf-8')
+    found = {}
+    with (gzip_open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')) as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            if offset >= end:
+                break
+            line_offset = offset
+            offset += len(line)
+
+            # Cheap checks first, only lines that may be one of the words are parsed.
+            if not line.startswith(noun_prefix):
+                continue
+            if not any(b'\\' in x or x.decode('utf-8') in words for x in WORD_FIELD.findall(line)):
+                continue
+            entry = loads(line)
+            word = entry.get('word')
+            if word in words and word not in found:
+                senses = entry.get('senses') or [{}]
+                found[word] = (line_offset, gender_from_tags(senses[0].get('tags', [])))
+    return found
+
+
+def genders_from_dump(path, words, workers=None):
+    '''
+    `{word: gender}` of every word whose first noun entry in the dump has a gender. Gzipped dumps can't be split into chunks and are read by one process.
+    '''
+    words = set(words)
+    workers = workers or cpu_count()
+    chunks = [(0, float('inf'))] if path.endswith('.gz') else _dump_chunks(path, workers * 4)
+
+    found = {}
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(_scan_dump, path, start, end, words) for start, end in chunks]
+        for future in futures:
+            for word, (offset, gender) in future.result().items():
+                if word not in found or offset < found[word][0]:
+                    found[word] = (offset, gender)
+    return {word: gender for word, (offset, gender) in found.items() if gender is not None}
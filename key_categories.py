@@ -0,0 +1,63 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Categories of lang keys, e.g. `block.minecraft.oak_planks` is a `block` of namespace `minecraft`, `subtitles.block.chest.open` a `subtitle` and `container.chest` a `container`. Keys from before 1.13 are classified too, e.g. `tile.stone.name` is a `block` of namespace `minecraft` and `tile.ironchest:IRON.name` one of namespace `ironchest`, while the modern `item.cfm.sofa.name` is an `item` of namespace `cfm`.
+
+Keys are classified by their first two segments, once per key: the result is kept for every language and for the knowledge base extractor. What a category gets (an article, a knowledge base entry...) is looked up in a `{category: namespace}` table, where the namespace is `None` for any, so a rule for another category is one more table entry.
+'''
+
+CATEGORIES_VERSION = 2                          # Bump whenever classification changes, so cached build outputs are invalidated.
+CATEGORIES = {
+    'item': 'item',
+    'block': 'block',
+    'tile': 'block',
+    'entity': 'entity',
+    'biome': 'biome',
+    'container': 'container',
+    'subtitles': 'subtitle',
+    'advancements': 'advancement',
+    'advancement': 'advancement',
+    'effect': 'effect',
+    'enchantment': 'enchantment',
+    'death': 'death',
+    'painting': 'painting',
+    'trim_material': 'trim',
+    'trim_pattern': 'trim',
+    'upgrade': 'upgrade',
+    'instrument': 'instrument',
+    'jukebox_song': 'music',
+    'gamerule': 'gamerule',
+    'stat': 'stat',
+    'gui': 'gui',
+    'options': 'options',
+    'key': 'key',
+    'commands': 'command',
+    'argument': 'command',
+    'tooltip': 'tooltip',
+}
+NAMESPACED = {'item', 'block', 'entity', 'biome', 'effect', 'enchantment', 'painting', 'trim', 'upgrade', 'instrument', 'music'}    # `<category>.<namespace>.<name>`
+
+_categories = {}                                # key -> (category, namespace)
+
+
+def classify(key):
+    '''
+    `(category, namespace)` of a key. The category is `other` for unknown keys, and the namespace `None` for categories without one.
+    '''
+    if key not in _categories:
+        parts = key.split('.', 2)
+        category = CATEGORIES.get(parts[0], 'other') if len(parts) > 1 else 'other'
+        namespace = parts[1] if len(parts) > 2 and category in NAMESPACED else None
+        if parts[0] in ('tile', 'item') and namespace is not None and key.endswith('.name') and (':' in namespace or key.count('.') == 2):
+            # `tile.<name>.name` or `tile.<namespace>:<name>.name`, but not `item.<namespace>.<name>.name`
+            namespace = namespace.split(':')[0] if ':' in namespace else 'minecraft'
+        _categories[key] = (category, namespace)
+    return _categories[key]
+
+
+def matches(key, table):
+    '''
+    Whether the key is in one of the categories of `table`, `{category: namespace or None for any}`.
+    '''
+    category, namespace = classify(key)
+    return category in table and table[category] in (None, namespace)
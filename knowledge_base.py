@@ -0,0 +1,187 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Knowledge base of grammatical genders (`word -> 'm'|'f'|'n'|'p'`) in a compact, versioned file that is memory-mapped instead of unpickled, so loading costs next to nothing and the file is safe to read from shared storage.
+
+A file holds two sorted string tables, each with a byte array of genders, which are binary-searched in place:
+* the words as they are, and
+* the words case-folded, for lookups of e.g. `Épée` or `ÉPÉE`. Folded words whose genders disagree are left out. Accents are kept, so that e.g. an English `The` left untranslated isn't taken for `thé`.
+Plurals of known words (`chênes`, `planchas`) are found by stripping plural suffixes from the folded word.
+
+Usage: python3 knowledge_base.py knowledgebase/mc_fr_fr.pickle ...      converts pickled knowledge bases.
+'''
+
+from mmap import ACCESS_READ, mmap
+from os import replace, stat
+from os.path import basename, exists
+from pickle import load
+from struct import Struct
+from sys import argv
+from unicodedata import category, normalize
+
+from german_compounds import CompoundKnowledgeBase
+
+MAGIC = b'MCKB'
+FORMAT_VERSION = 2                              # 2: folded words keep their accents
+HEADER = Struct('<4sHH8s')                      # magic, format version, reserved, language
+TABLE_HEADER = Struct('<II')                    # number of words, size of the string blob
+OFFSET_PAIR = Struct('<II')
+GENDERS = b'mfnp'
+
+# Plural suffix -> singular suffix, tried on folded words that aren't known themselves.
+PLURAL_SUFFIXES = {
+    'fr': (('aux', 'al'), ('x', ''), ('s', '')),
+    'es': (('es', ''), ('s', '')),
+}
+
+
+def knowledge_base_path(LANG):
+    return f'knowledgebase/mc_{LANG}.kb'
+
+
+def fold(word):
+    '''
+    Case-folded word without accents, for searching text. Knowledge base lookups only fold the case.
+    '''
+    return ''.join(c for c in normalize('NFD', word.casefold()) if category(c) != 'Mn')
+
+##################################################
+#    Reading
+##################################################
+class _Table:
+    def __init__(self, mm, offset):
+        self.mm = mm
+        self.count, blob_size = TABLE_HEADER.unpack_from(mm, offset)
+        offset += TABLE_HEADER.size
+        self.offsets = offset
+        offset += 4 * (self.count + 1)
+        self.genders = offset
+        self.blob = offset + self.count
+        self.end = _align(self.blob + blob_size)
+
+    def word(self, i):
+        start, end = OFFSET_PAIR.unpack_from(self.mm, self.offsets + 4 * i)
+        return self.mm[self.blob + start:self.blob + end]
+
+    def find(self, word):
+        key = word.encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.word(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self.word(lo) == key:
+            return chr(self.mm[self.genders + lo])
+        return None
+
+
+class KnowledgeBase:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mm = mmap(f.fileno(), 0, access=ACCESS_READ)
+        magic, version, _, lang = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f'⛔ {path} is not a knowledge base.')
+        if version != FORMAT_VERSION:
+            raise ValueError(f'⛔ {path} has format version {version}, expected {FORMAT_VERSION}. Rebuild or convert it.')
+        self.lang = lang.rstrip(b'\0').decode('ascii')
+        self.words = _Table(self.mm, HEADER.size)
+        self.folded = _Table(self.mm, self.words.end)
+
+    def get(self, word, default=None):
+        gender = self.words.find(word)
+        if gender is not None:
+            return gender
+        folded = word.casefold()
+        gender = self.folded.find(folded)
+        if gender is not None:
+            return gender
+        for suffix, singular in PLURAL_SUFFIXES.get(self.lang[:2], ()):
+            if folded.endswith(suffix) and len(folded) > len(suffix) + 2 and self.folded.find(folded[:-len(suffix)] + singular) is not None:
+                return 'p'
+        return default
+
+    def __getitem__(self, word):
+        gender = self.get(word)
+        if gender is None:
+            raise KeyError(word)
+        return gender
+
+    def __contains__(self, word):
+        return self.get(word) is not None
+
+    def __len__(self):
+        return self.words.count
+
+    def items(self):
+        for i in range(self.words.count):
+            yield self.words.word(i).decode('utf-8'), chr(self.mm[self.words.genders + i])
+
+    def close(self):
+        self.mm.close()
+
+##################################################
+#    Writing
+##################################################
+def _align(n):
+    return (n + 3) & ~3
+
+
+def _pack_table(worddict):
+    words = sorted((word.encode('utf-8'), gender) for word, gender in worddict.items())
+    offsets = [0]
+    for word, _ in words:
+        offsets.append(offsets[-1] + len(word))
+    table = TABLE_HEADER.pack(len(words), offsets[-1]) + Struct(f'<{len(offsets)}I').pack(*offsets) + \
+        ''.join(gender for _, gender in words).encode('ascii') + b''.join(word for word, _ in words)
+    return table + b'\0' * (_align(len(table)) - len(table))
+
+
+def write_knowledge_base(path, worddict, LANG):
+    worddict = {word: gender for word, gender in worddict.items() if gender is not None and gender.encode('ascii') in GENDERS}
+    folded = {}
+    for word, gender in worddict.items():
+        folded.setdefault(word.casefold(), set()).add(gender)
+    folded = {word: genders.pop() for word, genders in folded.items() if len(genders) == 1}
+
+    with open(f'{path}.tmp', 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, LANG.encode('ascii')))
+        f.write(_pack_table(worddict))
+        f.write(_pack_table(folded))
+    replace(f'{path}.tmp', path)
+
+
+def convert(pickle_path):
+    '''
+    Converts a pickled `{word: gender}` knowledge base, e.g. `knowledgebase/mc_fr_fr.pickle`, to `knowledgebase/mc_fr_fr.kb`. Only convert pickles you trust.
+    '''
+    LANG = basename(pickle_path).split('.')[0][len('mc_'):]
+    with open(pickle_path, 'rb') as f:
+        worddict = load(f)
+    path = pickle_path[:-len('.pickle')] + '.kb'
+    write_knowledge_base(path, worddict, LANG)
+    print(pickle_path, '->', path, f'({len(worddict)} words)')
+
+
+_opened = {}
+
+
+def open_knowledge_base(LANG):
+    '''
+    Knowledge base of the language, or `None` if there's none. It stays open until the file changes, so e.g. the German compound trie is only built once in watch mode.
+    '''
+    path = knowledge_base_path(LANG)
+    if not exists(path):
+        return None
+    st = stat(path)
+    signature = (st.st_mtime_ns, st.st_size)
+    if LANG not in _opened or _opened[LANG][0] != signature:
+        kbase = KnowledgeBase(path)
+        _opened[LANG] = (signature, CompoundKnowledgeBase(kbase) if LANG.startswith('de_') else kbase)
+    return _opened[LANG][1]
+
+if __name__ == '__main__':
+    for pickle_path in argv[1:]:
+        convert(pickle_path)
@@ -0,0 +1,63 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Legacy `.lang` files, used until Minecraft 1.12.2: one `key=value` per line, `#` comments, no quoting. See the hand-made packs in `old/`.
+
+Lang files are read line by line, and written line by line from the built translations without going through JSON. Newlines in values are written as `\\n`, the only thing the format can't hold.
+'''
+
+from itertools import chain
+from json import dumps, loads
+
+LEGACY_PACK_FORMAT = 3                          # Resource packs of 1.11 and 1.12
+BOM = '\ufeff'
+
+
+def parse_lang(lines):
+    '''
+    `{key: value}` of the lines of a legacy lang file. Blank lines, comments and lines without `=` are skipped.
+    '''
+    out = {}
+    for line in lines:
+        line = line.rstrip('\r\n').lstrip(BOM)
+        if not line or line.startswith('#') or '=' not in line:
+            continue
+        key, value = line.split('=', 1)
+        out[key] = value.replace('\\n', '\n')
+    return out
+
+
+def load_lang(f):
+    '''
+    Parsed lang file from a text file object, JSON or legacy. Asset objects have no file extension, so the format is told by the first character.
+    '''
+    head = []
+    for line in f:
+        head.append(line)
+        if line.strip(f'{BOM} \t\r\n'):
+            break
+    if ''.join(head).lstrip(f'{BOM} \t\r\n').startswith('{'):
+        return loads(''.join(head) + f.read())
+    return parse_lang(chain(head, f))
+
+
+def escape(value):
+    return value.replace('\r', '').replace('\n', '\\n')
+
+
+def lang_lines(out):
+    for key in sorted(out):
+        yield f'{key}={escape(out[key])}\n'
+
+
+def serialise_lang(out):
+    return ''.join(lang_lines(out)).encode('utf-8')
+
+
+def legacy_pack_metadata(mcmeta):
+    '''
+    `pack.mcmeta` bytes for legacy versions, from those of the pack.
+    '''
+    metadata = loads(mcmeta)
+    metadata['pack']['pack_format'] = LEGACY_PACK_FORMAT
+    return dumps(metadata, indent=4, ensure_ascii=False).encode('utf-8')
@@ -4,16 +4,35 @@ Copyleft Alexander Poone 2024 Edutainment.
 Main script. Outputs Minecraft resource pack for language learning while gaming.
 '''
 
-from glob import glob
-from json import *
-from os.path import exists, expanduser
-from pickle import dump, load
-from re import finditer, sub
-from shutil import copytree, copy2
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from io import StringIO, TextIOWrapper
+from os import makedirs, remove, replace
+from os.path import basename, dirname, exists, expanduser
+from shutil import copytree, ignore_patterns, rmtree
+from time import perf_counter
+from traceback import format_exc
 from zipfile import ZipFile
 
+from asset_index import index_path, lang_hashes, object_path
+from build_manifest import BuildManifest, digest, file_signature
+from build_stats import BuildStats
+from german_compounds import COMPOUNDS_VERSION
+from instances import list_instances, version_key
+from key_categories import CATEGORIES_VERSION, matches
+from knowledge_base import knowledge_base_path, open_knowledge_base
+from legacy_lang import legacy_pack_metadata, load_lang, serialise_lang
+from mod_jars import ModJarIndex, prune
 from optional_village_names import patch_village_names
+from overlay import Overlay
 from optional_villager_names import patch_villager_names
+from pack_diff import diff_packs, format_report, read_pack
+from pack_writer import serialise, write_pack_zip
+from rules import RULES_VERSION, annotate, prepare
+from transform_cache import transform_cache
+from vocabulary import translation_sources, update_vocabulary
+from watcher import open_watcher
 
 ##################################################
 #    User Config              TODO: Tkinter GUI
@@ -27,51 +46,7 @@ VERSION_TO_BE_PATCHED = '1.21'
 ##################################################
 CURSEFORGE_INSTALLED = exists(expanduser('~/curseforge/minecraft'))
 LEAPFROG = '1.21'						        # Leapfrog to the latest translation, e.g., 1.20.6 using 1.21's updated translation.
-SUPPORTED_MOD_LIST = ('advancementframes',		# It doesn't matter if some mods are not installed, the script will skip them.
-            'areas',
-            'betterlily',
-            'betterpvp',
-            'biomesoplenty',
-            'cfm',
-            'comforts',
-            'croptopia',
-            'curios',
-            'dummmmmmy',
-            'explorerscompass',
-            'farmersdelight',
-            'goated',
-            'hauntedharvest',
-            'heartstone',
-            'jade',
-            'jeed',
-            'jei',
-            'labels',
-            'map_atlases',
-            'mcw-bridges',
-            'mcw-doors',
-            'mcw-fences',
-            'mcw-lights',
-            'mcw-paintings',
-            'mcw-paths',
-            'mcw-roofs',
-            'mcw-trapdoors',
-            'mcw-windows',
-            'modmenu',
-            'moonlight',
-            'moyai',
-            'naturescompass',
-            'oculus',
-            'polytone',
-            'sereneseasons',
-            'sleep_tight',
-            'smarterfarmers',
-            'snowyspirit',
-            'supplementaries',
-            'suppsquared',
-            'terralith',
-            'toughasnails',
-            'wthit',
-            'xaeros_minimap',)
+FLATTENING = '1.13'                             # Lang files are JSON since 1.13, and most keys were renamed.
 
 if CURSEFORGE_INSTALLED:
     MC_HOME = expanduser('~/curseforge/minecraft/Install')
@@ -80,207 +55,456 @@ if CURSEFORGE_INSTALLED:
 else:
     MC_HOME = MC_MODS = expanduser('~/AppData/Roaming/.minecraft')
 
+VANILLA_GENDERED = {'item': 'minecraft', 'block': 'minecraft', 'entity': 'minecraft', 'biome': None, 'container': None}    # Key categories that get an article, see `key_categories`
+MOD_GENDERED = {'item': None, 'block': None, 'entity': None, 'biome': None}
+LOCALE_FALLBACKS = {                            # Locales a mod is translated from if it has no translation for the language, best first.
+    'es_ar': ('es_mx', 'es_419', 'es_es'),
+    'es_mx': ('es_419', 'es_es'),
+    'es_cl': ('es_419', 'es_mx', 'es_es'),
+    'es_uy': ('es_ar', 'es_419', 'es_mx', 'es_es'),
+    'fr_ca': ('fr_fr',),
+    'de_at': ('de_de',),
+    'de_ch': ('de_de',),
+    'pt_pt': ('pt_br',),
+    'pt_br': ('pt_pt',),
+}
+
 ##################################################
 #    Translation
 ##################################################
-def main():
-    for LANG in LANGUAGES_TO_BE_PATCHED:
-        latestHashInt = sorted([int(x.split('.')[0].split('\\')[-1]) for x in glob(f'{MC_HOME}/assets/indexes\\*')])[-1]
-        hash = loads(open(f'{MC_HOME}/assets/indexes/{latestHashInt}.json', 'r',
-                     encoding='utf-8').read())['objects'][f'minecraft/lang/{LANG}.json']['hash']
-        print('Hash found: ', hash)
-
-        trans = loads(open(
-            f'{MC_HOME}/assets/objects/{hash[:2]}/{hash}', 'r', encoding='utf-8').read())
-
-        # Reset `out`
-        out = loads(ZipFile(f'{MC_HOME}/versions/{LEAPFROG}/{LEAPFROG}.jar').open(
-            'assets/minecraft/lang/en_us.json').read())
-
-        # print(set([trans[k].split(' ')[0].lower() for k in trans if k.startswith('item.minecraft') or k.startswith('block.minecraft')]))
-        kbase = None
-        if exists(f'knowledgebase/mc_{LANG}.pickle'):
-            with open(f'knowledgebase/mc_{LANG}.pickle', 'rb') as f:
-                kbase = load(f)
-
-        ##################################################
-        #    Payload
-        ##################################################
-        for k in trans:
-            if k in out:
-                if LANG.startswith('es_'):
-                    out[k] = sub('(?<!C|S|P|c|s|p)h', '<h>', trans[k].replace('iencio', '`iencio').replace('iencia', '`iencia').replace('ienso', '`ienso').replace('iensa', '`iensa').replace('iense', '`iense').replace('iento', '`iento').replace('ienta', '`ienta').replace('iente', '`iente').replace(
-                        'iende', '`iende').replace('iando', '`iando').replace('ianda', '`ianda').replace('uevo', '`uevo').replace('ueva', '`ueva').replace('ueve', '`ueve').replace('ier', '`ier').replace('uer', '`uer').replace('v', 'v(b)').replace('H', '<H>').replace('V', 'V(B)')) + ' / ' + out[k].replace('%s', '●')
-                elif LANG.startswith('fr_'):
-                    if kbase is not None:            # if the grammar file for that language exists
-                        if k.startswith('item.minecraft') or k.startswith('block.minecraft') or k.startswith('entity.minecraft') or k.startswith('biome.') or k.startswith('container.'):
-                            spl = trans[k].split(' ')
-                            firstword = spl[0].lower()
-                            rest = ' '.join(spl[1:])
-                            if rest != '':
-                                rest = f' {rest}'
-                            if firstword in kbase:
-                                if kbase[firstword] == 'm':
-                                    trans[k] = f'Un {firstword}{rest}'
-                                if kbase[firstword] == 'f':
-                                    trans[k] = f'Une {firstword}{rest}'
-                                if kbase[firstword] == 'p':
-                                    trans[k] = f'Des {firstword}{rest}'
-                    tmp = sub(r'iz(?=$| )', 'i<z>', sub(r'mp(?=$| )', '<mp>', sub(r'(?<!C|S|P|c|s|p)h', '<h>', sub(
-                        r'(?<!C|S|P|c|s|p)H', '<H>', trans[k])))).replace('ufs', '<ufs>')
-                    foo = finditer(r' qui (se )?[a-zéèç"]+nt(?= |$|\.)', tmp)
-                    for bar in foo:
-                        # print(bar.group(), sub('nt$', '<nt>', bar.group()))
-                        tmp = tmp.replace(bar.group(), sub('nt$', '<nt>', bar.group()))
-                    if out[k] != tmp:
-                        out[k] = tmp + ' / ' + out[k].replace('%s', '●')
-                elif LANG.startswith('de_'):
-                    if kbase is not None:            # if the grammar file for that language exists
-                        if k.startswith('item.minecraft') or k.startswith('block.minecraft') or k.startswith('entity.minecraft') or k.startswith('biome.') or k.startswith('container.'):
-                            spl = trans[k].split(' ')
-                            firstword = spl[0]
-                            rest = ' '.join(spl[1:])
-                            if rest != '':
-                                rest = f' {rest}'
-                            if firstword in kbase:
-                                if kbase[firstword] == 'm':
-                                    trans[k] = f'Der {firstword}{rest}'
-                                if kbase[firstword] == 'f':
-                                    trans[k] = f'Die {firstword}{rest}'
-                                if kbase[firstword] == 'n':
-                                    trans[k] = f'Das {firstword}{rest}'
-                                if kbase[firstword] == 'p':
-                                    trans[k] = f'(pl.) {firstword}{rest}'
-                    if out[k] != trans[k]:
-                        out[k] = trans[k] + ' / ' + out[k].replace('%s', '●')
-                else:
-                    if out[k] != trans[k]:
-                        out[k] = trans[k] + ' / ' + out[k].replace('%s', '●')
-
-        for mod in SUPPORTED_MOD_LIST:
+def locale_chain(LANG):
+    return (LANG,) + LOCALE_FALLBACKS.get(LANG, ())
+
+
+def best_locale(LANG, locales):
+    '''
+    The first locale of the fallback chain of the language that is in `locales`, or `None`.
+    '''
+    return next((locale for locale in locale_chain(LANG) if locale in locales), None)
+
+
+def add_mod(LANG, out, mod_trans, mod_en, kbase):
+    '''
+    Adds the translated keys of a mod that differ from its English to `out`.
+    '''
+    prepare(LANG, mod_trans.values(), mod=True)
+    for k in mod_trans:
+        if k in mod_en:
+            value = annotate(LANG, mod_trans[k], mod_en[k], kbase, matches(k, MOD_GENDERED), mod=True)
+            if value != mod_en[k]:
+                out[k] = value
+
+
+def leapfrog(version):
+    '''
+    Version whose translations an instance of `version` uses: `LEAPFROG` for older versions, or its own version if it's newer and installed. Versions before the flattening keep theirs, their keys are different.
+    '''
+    if version_key(version) < version_key(FLATTENING):
+        return version
+    if version_key(version) > version_key(LEAPFROG) and exists(f'{MC_HOME}/versions/{version}/{version}.jar'):
+        return version
+    return LEAPFROG
+
+
+def is_legacy(version, lang_format=None):
+    '''
+    Whether an instance gets `.lang` files instead of JSON, by default if its version is older than 1.13.
+    '''
+    if lang_format is not None:
+        return lang_format == 'lang'
+    return version_key(version) < version_key(FLATTENING)
+
+
+_base = {}                                      # version -> (key, base)
+
+
+def load_base(version=LEAPFROG):
+    '''
+    Data shared by all languages and all instances of a version: the lang file hashes from its asset index, the English strings of its jar, and the version. Kept in memory until the index or the jar change, e.g. in watch mode.
+    '''
+    index = index_path(MC_HOME, version)
+    jar = f'{MC_HOME}/versions/{version}/{version}.jar'
+    key = (index, file_signature(index), file_signature(jar))
+    if version not in _base or _base[version][0] != key:
+        lang = lang_hashes(MC_HOME, version)
+        hashes = {LANG: lang[LANG] for LANG in LANGUAGES_TO_BE_PATCHED if LANG in lang}
+        with ZipFile(jar) as z:
+            name = 'assets/minecraft/lang/en_us.json'
+            if name not in z.namelist():
+                name = 'assets/minecraft/lang/en_us.lang'
+            en_us = load_lang(TextIOWrapper(z.open(name), encoding='utf-8'))
+        _base[version] = (key, (hashes, en_us, version))
+    return _base[version][1]
+
+
+def install_pack_folder(instance=MC_MODS):
+    # If resourcepack folder is not present under installation, copy local resourcepack folder to destination
+    if not exists(f'{instance}/resourcepacks'):
+        copytree('resourcepacks', f'{instance}/resourcepacks', ignore=ignore_patterns('crammese.*'))
+    elif not exists(f'{instance}/resourcepacks/crammese'):
+        copytree('resourcepacks/crammese', f'{instance}/resourcepacks/crammese')
+
+
+def remove_other_install(instance, output):
+    '''
+    Removes the pack an earlier build installed the other way, zip or folder, so the game doesn't list both.
+    '''
+    folder, zip_path = f'{instance}/resourcepacks/crammese', f'{instance}/resourcepacks/crammese.zip'
+    if output == 'zip' and exists(f'{folder}/pack.mcmeta'):
+        rmtree(folder)
+        print(f'🧹 Removed {folder}, the pack is installed as a zip now.')
+    elif output == 'folder' and exists(zip_path):
+        remove(zip_path)
+        print(f'🧹 Removed {zip_path}, the pack is installed as a folder now.')
+
+
+def main(jobs=1, force=False, output='zip', compact=False, stats_json=None, profile=False, persist_cache=False, instances=None, lang_format=None, diff=False, vocabulary=False):
+    '''
+    Builds and installs the pack of every `(instance folder, version)`, by default only the configured instance. `lang_format` is `json` or `lang`, by default it depends on the version of each instance. With `diff`, the keys that changed in each installed pack are reported. Instances share what doesn't depend on the instance: the English strings and translated keys of a version, knowledge bases, parsed lang files and fragments of the same jar, and annotated values.
+    '''
+    instances = instances or [(MC_MODS, VERSION_TO_BE_PATCHED)]
+    stats = BuildStats(stats_json is not None, profile)
+    manifest = BuildManifest(force=force)
+    pool = None
+    referenced = set()                          # Lang files of the jars of every instance, see `mod_jars.prune`
+    if jobs > 1:
+        # The base data of every version is loaded once here and handed to the workers. One pool for all instances, so workers keep what they loaded for the previous instances.
+        bases = {}
+        for instance, version in instances:
+            try:
+                bases[leapfrog(version)] = load_base(leapfrog(version))
+            except Exception:
+                pass                            # Reported by the build of the instance
+        pool = ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(bases, force, compact, stats.enabled, profile, persist_cache))
+    try:
+        for instance, version in instances:
+            if len(instances) > 1:
+                print('##################################################')
+                print(f'🧱 {basename(instance)} ({version})')
             try:
-                mod_trans_json_str = sub('//.*', '', ZipFile(glob(f'{MC_MODS}/mods/{mod}*.jar')[0]).open(f'assets/{mod.replace("-", "").replace("trap", "trp").replace(
-                    "wthit", "waila").replace("xaeros_", "xaero").replace("betterpvp", "xaerobetterpvp").replace("oculus", "iris")}/lang/{LANG}.json').read().decode('utf-8'))
-                mod_trans = loads(mod_trans_json_str)
-                mod_en = loads(ZipFile(glob(f'{MC_MODS}/mods/{mod}*.jar')[0]).open(f'assets/{mod.replace("-", "").replace("trap", "trp").replace(
-                    "wthit", "waila").replace("xaeros_", "xaero").replace("betterpvp", "xaerobetterpvp").replace("oculus", "iris")}/lang/en_us.json').read().decode('utf-8'))
-
-                for k in mod_trans:
-                    if k in mod_en:
-                        if LANG.startswith('es_'):
-                            mod_en[k] = sub('(?<!C|S|P|c|s|p)h', '<h>', mod_trans[k].replace('iencio', '`iencio').replace('iencia', '`iencia').replace('ienso', '`ienso').replace('iensa', '`iensa').replace('iense', '`iense').replace('iento', '`iento').replace('ienta', '`ienta').replace('iente', '`iente').replace(
-                                'iende', '`iende').replace('iando', '`iando').replace('ianda', '`ianda').replace('uevo', '`uevo').replace('ueva', '`ueva').replace('ueve', '`ueve').replace('ier', '`ier').replace('uer', '`uer').replace('v', 'v(b)').replace('H', '<H>').replace('V', 'V(B)')) + ' / ' + mod_en[k].replace('%s', '●')
-                        elif LANG.startswith('fr_'):
-                            if kbase is not None:            # if the grammar file for that language exists
-                                if k.startswith('item.') or k.startswith('block.') or k.startswith('entity.') or k.startswith('biome.'):
-                                    spl = mod_trans[k].split(' ')
-                                    firstword = spl[0].lower()
-                                    rest = ' '.join(spl[1:])
-                                    if rest != '':
-                                        rest = f' {rest}'
-                                    if firstword in kbase:
-                                        if kbase[firstword] == 'm':
-                                            mod_trans[k] = f'Un {firstword}{rest}'
-                                        if kbase[firstword] == 'f':
-                                            mod_trans[k] = f'Une {firstword}{rest}'
-                                        if kbase[firstword] == 'p':
-                                            mod_trans[k] = f'Des {firstword}{rest}'
-
-                                tmp = sub(r'iz(?=$| )', 'i<z>', sub(r'mp(?=$| )', '<mp>', sub(r'(?<!C|S|P|c|s|p)h', '<h>', sub(r'(?<!C|S|P|c|s|p)H', '<H>', mod_trans[k].replace(
-                                    'éé', 'é'))))).replace(' de vérification', ' à damiers').replace('Block ', 'Bloc ').replace('ufs', '<ufs>').replace('Pattes', 'Pâtes')
-                                foo = finditer(r' qui (se )?[a-zéèç"]+nt(?= |$|\.)', tmp)
-                                for bar in foo:
-                                    print(bar.group(), sub('nt$', '<nt>', bar.group()))
-                                    tmp = tmp.replace(bar.group(), sub(
-                                        'nt$', '<nt>', bar.group()))
-                                if mod_en[k] != tmp:
-                                    mod_en[k] = tmp + ' / ' + mod_en[k].replace('%s', '●')
-                        elif LANG.startswith('de_'):
-                            if kbase is not None:            # if the grammar file for that language exists
-                                if k.startswith('item.') or k.startswith('block.') or k.startswith('entity.') or k.startswith('biome.'):
-                                    spl = mod_trans[k].split(' ')
-                                    firstword = spl[0].replace('Kokusnuss', 'Kokosnuss')
-                                    rest = ' '.join(spl[1:])
-                                    if rest != '':
-                                        rest = f' {rest}'
-                                    if firstword in kbase:
-                                        if kbase[firstword] == 'm':
-                                            mod_trans[k] = f'Der {firstword}{rest}'
-                                        if kbase[firstword] == 'f':
-                                            mod_trans[k] = f'Die {firstword}{rest}'
-                                        if kbase[firstword] == 'n':
-                                            mod_trans[k] = f'Das {firstword}{rest}'
-                                        if kbase[firstword] == 'p':
-                                            mod_trans[k] = f'(pl.) {firstword}{rest}'
-                            if mod_en[k] != mod_trans[k]:
-                                mod_en[k] = mod_trans[k] + ' / ' + mod_en[k].replace('%s', '●')
-                        else:
-                            if mod_en[k] != mod_trans[k]:
-                                mod_en[k] = mod_trans[k] + ' / ' + mod_en[k].replace('%s', '●')
-                for k in mod_en:
-                    out[k] = mod_en[k]
-                print(mod, ' ' * (30-len(mod)), '☑️ Done.')
-            except KeyError as e:
-                print(mod, ' ' * (30-len(mod)), 'Translation file not found, skipping...')
-            except IndexError as e:
-                print(mod, ' ' * (30-len(mod)), 'Mod not found, skipping...')
-            except Exception as e:
-                # Get the Peninsular Spanish translation file if there's no Rioplatense Spanish.
-                if LANG == 'es_ar':
-                    try:
-                        mod_trans = loads(ZipFile(glob(f'{MC_MODS}/mods/{mod}*.jar')[0]).open(f'assets/{mod.replace("-", "").replace("trap", "trp").replace(
-                            "wthit", "waila").replace("xaeros_", "xaero").replace("betterpvp", "xaerobetterpvp").replace("oculus", "iris")}/lang/es_mx.json').read().decode('utf-8'))
-                        mod_en = loads(ZipFile(glob(f'{MC_MODS}/mods/{mod}*.jar')[0]).open(f'assets/{mod.replace("-", "").replace("trap", "trp").replace(
-                            "wthit", "waila").replace("xaeros_", "xaero").replace("betterpvp", "xaerobetterpvp").replace("oculus", "iris")}/lang/en_us.json').read().decode('utf-8'))
-
-                        for k in mod_trans:
-                            if k in mod_en:
-                                if LANG.startswith('es_'):
-                                    mod_en[k] = sub('(?<!C|c)h', '<h>', mod_trans[k].replace('iencio', '`iencio').replace('iencia', '`iencia').replace('ienso', '`ienso').replace('iensa', '`iensa').replace('iense', '`iense').replace('iento', '`iento').replace('ienta', '`ienta').replace('iente', '`iente').replace(
-                                        'iende', '`iende').replace('iando', '`iando').replace('ianda', '`ianda').replace('uevo', '`uevo').replace('ueva', '`ueva').replace('ueve', '`ueve').replace('ier', '`ier').replace('uer', '`uer').replace('v', 'v(b)').replace('H', '<H>').replace('V', 'V(B)')) + ' / ' + mod_en[k].replace('%s', '●')
-                                else:
-                                    mod_en[k] = mod_trans[k] + ' / ' + \
-                                        mod_en[k].replace('%s', '●')
-                        for k in mod_en:
-                            out[k] = mod_en[k]
-                        print(mod, ' ' * (30-len(mod)), '☑️ Done.')
-                    except:
-                        try:
-                            mod_trans = loads(ZipFile(glob(f'{MC_MODS}/mods/{mod}*.jar')[0]).open(f'assets/{mod.replace("-", "").replace("trap", "trp").replace(
-                                "wthit", "waila").replace("xaeros_", "xaero").replace("betterpvp", "xaerobetterpvp").replace("oculus", "iris")}/lang/es_es.json').read().decode('utf-8'))
-                            mod_en = loads(ZipFile(glob(f'{MC_MODS}/mods/{mod}*.jar')[0]).open(f'assets/{mod.replace("-", "").replace("trap", "trp").replace(
-                                "wthit", "waila").replace("xaeros_", "xaero").replace("betterpvp", "xaerobetterpvp").replace("oculus", "iris")}/lang/en_us.json').read().decode('utf-8'))
-
-                            for k in mod_trans:
-                                if k in mod_en:
-                                    if LANG.startswith('es_'):
-                                        mod_en[k] = sub('(?<!C|c)h', '<h>', mod_trans[k].replace('iencio', '`iencio').replace('iencia', '`iencia').replace('ienso', '`ienso').replace('iensa', '`iensa').replace('iense', '`iense').replace('iento', '`iento').replace('ienta', '`ienta').replace('iente', '`iente').replace(
-                                            'iende', '`iende').replace('iando', '`iando').replace('ianda', '`ianda').replace('uevo', '`uevo').replace('ueva', '`ueva').replace('ueve', '`ueve').replace('ier', '`ier').replace('uer', '`uer').replace('v', 'v(b)').replace('H', '<H>').replace('V', 'V(B)')) + ' / ' + mod_en[k].replace('%s', '●')
-                                    else:
-                                        mod_en[k] = mod_trans[k] + ' / ' + \
-                                            mod_en[k].replace('%s', '●')
-                            for k in mod_en:
-                                out[k] = mod_en[k]
-                            print(mod, ' ' * (30-len(mod)), '☑️ Done.')
-                        except Exception as ee:
-                            print(mod, ' ' * (30-len(mod)), f'❎ {ee}')
-                else:
-                    print(mod, ' ' * (30-len(mod)), f'❎ {e}')
-
-        outfilename = f'resourcepacks/crammese/assets/minecraft/lang/cm_{"ar" if LANG == "es_ar" else LANG[:2]}.json'
-        open(outfilename, 'w', encoding='utf-8').write(dumps(out, indent=2))
-
-        # If resourcepack folder is not present under installation, copy local resourcepack folder to destination
-        if not exists(f'{MC_MODS}/resourcepacks'):
-            copytree('resourcepacks', f'{MC_MODS}/resourcepacks')
-        elif not exists(f'{MC_MODS}/resourcepacks/crammese'):
-            copytree('resourcepacks/crammese', f'{MC_MODS}/resourcepacks/crammese')
-        elif not exists(f'{MC_MODS}/{outfilename}'):
-            copy2(outfilename, f'{MC_MODS}/{outfilename}')
+                referenced |= build_instance(instance, version, manifest, pool, output, compact, stats, persist_cache, lang_format, diff, vocabulary)
+            except Exception:
+                # A broken instance shouldn't abort the others.
+                if len(instances) == 1:
+                    raise
+                print(f'⛔ {basename(instance)} failed:\n{format_exc()}')
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    prune(referenced)
+
+    if len(instances) > 1:
+        # Forget instances that are gone, so that their fragments are dropped.
+        prefixes = {instance_prefix(instance) for instance, version in instances}
+        for key in [key for key in manifest.languages if '/' in key and key[:key.index('/') + 1] not in prefixes]:
+            del manifest.languages[key]
+    manifest.save()
+
+    if stats.enabled:
+        stats.report()
+    if stats_json is not None:
+        stats.save(stats_json)
+
+
+def build_instance(instance, version, manifest, pool=None, output='zip', compact=False, stats=None, persist_cache=False, lang_format=None, diff=False, vocabulary=False):
+    stats = stats or BuildStats()
+    pack = f'{instance}/resourcepacks/crammese.zip' if output == 'zip' else f'{instance}/resourcepacks/crammese'
+    previous = read_pack(pack) if diff else None
+    base = load_base(leapfrog(version))
+    legacy = is_legacy(version, lang_format)
+    mcmeta = open('resourcepacks/crammese/pack.mcmeta', 'rb').read()
+    if legacy:
+        mcmeta = legacy_pack_metadata(mcmeta)
+    if output == 'folder':
+        # Also when not legacy, so a folder an earlier `.lang` build installed gets its pack format back.
+        install_pack_folder(instance)
+        with open(f'{instance}/resourcepacks/crammese/pack.mcmeta', 'wb') as f:
+            f.write(mcmeta)
+    members = {'pack.mcmeta': mcmeta}
+    with ModJarIndex(f'{instance}/mods') as jars:
+        # Discover the mods once up front, so workers find every jar in the cache.
+        print(f'🔎 {len(jars.mods())} mods found.')
+        jars.save()
+        namespaces = {mod for mod, jar in jars.mods()}
+        referenced = jars.referenced()
+        if pool is not None:
+            # Each worker returns its captured output, which is printed in language order.
+            results = pool.map(_build_in_worker, [(LANG, instance, base[2], legacy) for LANG in LANGUAGES_TO_BE_PATCHED])
+            for LANG, (output_text, entry, data, languages) in zip(LANGUAGES_TO_BE_PATCHED, results):
+                print(output_text, end='')
+                stats.merge(languages)
+                collect_language(LANG, entry, data, manifest, members, output, instance, legacy)
         else:
-            open(f'{MC_MODS}/{outfilename}', 'w', encoding='utf-8').write(dumps(out, indent=2))
+            for LANG in LANGUAGES_TO_BE_PATCHED:
+                entry, data = run_language(LANG, jars, base, manifest, compact, stats, persist_cache, instance, legacy)
+                collect_language(LANG, entry, data, manifest, members, output, instance, legacy)
+        if vocabulary:
+            # Lang files that changed since the last build are tokenised again, in this process.
+            for LANG in LANGUAGES_TO_BE_PATCHED:
+                locales = {mod: best_locale(LANG, jars.locales(jar, mod)) for mod, jar in jars.mods()}
+                update_vocabulary(f'{instance_prefix(instance)}{LANG}', LANG, translation_sources(jars, MC_HOME, base[0][LANG], locales)).close()
+
+    remove_other_install(instance, output)
+    if output == 'zip':
+        makedirs(f'{instance}/resourcepacks', exist_ok=True)
+        # The previous lang file of a language that failed to build is kept.
+        if write_pack_zip(f'{instance}/resourcepacks/crammese.zip', members, {lang_filename(LANG, legacy) for LANG in LANGUAGES_TO_BE_PATCHED}):
+            print(f'📦 {instance}/resourcepacks/crammese.zip')
+        else:
+            print('📦 Resource pack unchanged.')
+
+    if diff:
+        print(format_report(diff_packs(previous, read_pack(pack), namespaces)))
+    return referenced
+
+
+def watch(output='zip', compact=False, persist_cache=False, instances=None, lang_format=None, vocabulary=False):
+    '''
+    Rebuilds whenever mods, asset indexes or knowledge bases change. Builds run in this process, so the English strings, knowledge bases, rules and fragments stay in memory, and the build manifest makes sure only affected mods and languages are rebuilt.
+    '''
+    folders = [f'{instance}/mods' for instance, version in instances or [(MC_MODS, VERSION_TO_BE_PATCHED)]]
+    watcher = open_watcher(folders + [f'{MC_HOME}/assets/indexes', 'knowledgebase'])
+    try:
+        main(output=output, compact=compact, persist_cache=persist_cache, instances=instances, lang_format=lang_format, vocabulary=vocabulary)
+        print('👀 Watching for changes, Ctrl+C to stop.')
+        while True:
+            changed = watcher.wait()
+            print('👀', ', '.join(sorted(basename(path) for path in changed)))
+            start = perf_counter()
+            try:
+                main(output=output, compact=compact, persist_cache=persist_cache, instances=instances, lang_format=lang_format, vocabulary=vocabulary)
+            except Exception:
+                print(f'⛔ Build failed, waiting for the next change:\n{format_exc()}')
+                continue
+            print(f'⏱️ Rebuilt in {perf_counter() - start:.2f}s, press F3+T in game to reload.')
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+def lang_filename(LANG, legacy=False):
+    return f'assets/minecraft/lang/cm_{"ar" if LANG == "es_ar" else LANG[:2]}.{"lang" if legacy else "json"}'
+
+
+def instance_prefix(instance):
+    '''
+    Prefix of the manifest entries of an instance. Empty for the configured instance, so that batch builds and normal builds share its entries.
+    '''
+    return '' if instance == MC_MODS else f'{basename(instance)}/'
+
+
+def built_filename(LANG, instance=MC_MODS, legacy=False):
+    '''
+    Where the last built lang file of an instance is kept, to be reused when nothing changed.
+    '''
+    prefix = instance_prefix(instance)
+    return f'resourcepacks/crammese.instances/{prefix}{lang_filename(LANG, legacy)}' if prefix else f'resourcepacks/crammese/{lang_filename(LANG, legacy)}'
+
+
+def collect_language(LANG, entry, data, manifest, members, output, instance=MC_MODS, legacy=False):
+    if entry is None:
+        return
+    manifest.record(f'{instance_prefix(instance)}{LANG}', entry)
+    if data is None:                # Unchanged, reuse the last build
+        data = open(built_filename(LANG, instance, legacy), 'rb').read()
+    if output == 'zip':
+        members[lang_filename(LANG, legacy)] = data
+    else:
+        path = f'{instance}/resourcepacks/crammese/{lang_filename(LANG, legacy)}'
+        with open(f'{path}.tmp', 'wb') as f:
+            f.write(data)
+        replace(f'{path}.tmp', path)
+
+
+_worker = {}
+
+
+def _init_worker(bases, force, compact, stats, profile, persist_cache):
+    _worker['bases'] = bases                    # version -> base data loaded by the parent
+    _worker['jars'] = {}                        # instance -> ModJarIndex
+    _worker['manifest'] = BuildManifest(force=force)
+    _worker['compact'] = compact
+    _worker['stats'] = (stats, profile)
+    _worker['persist_cache'] = persist_cache
+
+
+def _build_in_worker(task):
+    LANG, instance, version, legacy = task
+    if instance not in _worker['jars']:
+        _worker['jars'][instance] = ModJarIndex(f'{instance}/mods')
+    buffer = StringIO()
+    stats = BuildStats(*_worker['stats'])
+    with redirect_stdout(buffer):
+        entry, data = run_language(LANG, _worker['jars'][instance], _worker['bases'][version], _worker['manifest'], _worker['compact'], stats, _worker['persist_cache'], instance, legacy)
+    return buffer.getvalue(), entry, data, stats.languages
+
+
+def run_language(LANG, jars, base, manifest, compact=False, stats=None, persist_cache=False, instance=MC_MODS, legacy=False):
+    # A failing language shouldn't abort the others.
+    try:
+        with (stats or BuildStats()).measure_language(LANG):
+            return build_language(LANG, jars, base, manifest, compact, stats, persist_cache, instance, legacy)
+    except Exception:
+        print(f'⛔ {LANG} failed:\n{format_exc()}')
+        return None, None
+
+
+def mod_inputs(LANG, jars, mod, jar):
+    '''
+    Which jar provides the mod, and the size and CRC of every lang file the mod's fragment may be built from.
+    '''
+    return [basename(jar)] + [[locale] + jars.signature(jar, mod, locale) for locale in sorted(jars.locales(jar, mod)) if locale in locale_chain(LANG) + ('en_us',)]
+
+
+def mod_english(jars, manifest, mod, jar):
+    '''
+    Inputs and English strings of a mod, which are shared by all languages.
+    '''
+    inputs = {'mod': mod, 'jar': basename(jar), 'en_us': jars.signature(jar, mod, 'en_us')}
+    english = manifest.load_fragment(inputs)
+    if english is None:
+        english = jars.read(jar, mod, 'en_us')
+        manifest.save_fragment(inputs, english)
+    return inputs, english
+
+
+def build_mod(LANG, jars, mod, jar, locale, kbase, stats):
+    '''
+    The translated keys of the mod that differ from its English, read from its `locale` lang file, or `None` if it can't be translated.
+    '''
+    fragment = {}
+    try:
+        mod_trans = jars.read(jar, mod, locale, strip_comments=True)
+        mod_en = jars.read(jar, mod, 'en_us')
+        add_mod(LANG, fragment, mod_trans, mod_en, kbase)
+        stats.count_annotated(fragment, mod_en)
+        print(mod, ' ' * (30-len(mod)), '☑️ Done.' if locale == LANG else f'☑️ Done from {locale}.')
+        return fragment
+    except Exception as e:
+        print(mod, ' ' * (30-len(mod)), f'❎ {e}')
+    return None
+
+
+def build_language(LANG, jars, base, manifest, compact=False, stats=None, persist_cache=False, instance=MC_MODS, legacy=False):
+    '''
+    Returns the manifest entry of the language, and its serialised lang file, JSON or `.lang` if `legacy`, or `None` if it didn't change.
+    '''
+    stats = stats or BuildStats()
+    hashes, en_us, version = base
+    hash = hashes[LANG]
+    print('Hash found: ', hash)
+
+    key = f'{instance_prefix(instance)}{LANG}'
+    outfilename = built_filename(LANG, instance, legacy)
+    common = {'lang': LANG,
+              'knowledgebase': file_signature(knowledge_base_path(LANG)),
+              'rules': RULES_VERSION,
+              'compounds': COMPOUNDS_VERSION,
+              'categories': CATEGORIES_VERSION}
+    vanilla_inputs = dict(common, asset=hash, leapfrog=file_signature(f'{MC_HOME}/versions/{version}/{version}.jar'))
+    mods = jars.mods()
+    # Pick the lang file of each mod up front, e.g. `es_mx` for `es_ar` if the mod has no `es_ar.json`.
+    locales = {mod: best_locale(LANG, jars.locales(jar, mod)) for mod, jar in mods}
+    inputs = dict(vanilla_inputs, compact=compact, legacy=legacy, mods={mod: mod_inputs(LANG, jars, mod, jar) for mod, jar in mods})
+    if manifest.is_fresh(key, inputs, outfilename):
+        print('Nothing changed, skipping...')
+        return manifest.languages[key], None
+
+    kbase = None
+    fragments = []
+    cache = transform_cache(LANG)
+    cache.validate(digest(common), persist_cache)
+
+    ##################################################
+    #    Payload
+    ##################################################
+    with stats.measure(LANG, 'minecraft'):
+        vanilla = manifest.load_fragment(vanilla_inputs)
+        if vanilla is None:
+            trans = load_lang(open(object_path(MC_HOME, hash), 'r', encoding='utf-8'))
+            stats.count('keys_read', len(trans))
+            kbase = stats.knowledge_base(open_knowledge_base(LANG))
+
+            vanilla = {}
+            prepare(LANG, trans.values())
+            for k in trans:
+                if k in en_us:
+                    value = annotate(LANG, trans[k], en_us[k], kbase, matches(k, VANILLA_GENDERED))
+                    if value != en_us[k]:
+                        vanilla[k] = value
+            stats.count_annotated(vanilla, en_us)
+            manifest.save_fragment(vanilla_inputs, vanilla)
+    out = Overlay([en_us, vanilla])
+    fragments.append(manifest.fragment_name(vanilla_inputs))
+
+    fragment_inputs = {mod: dict(common, mod=mod, jar=inputs['mods'][mod]) for mod, jar in mods if locales[mod] is not None}
+    cached = {mod: manifest.load_fragment(fragment_inputs[mod]) for mod in fragment_inputs}
+    # Lang files of the mods to rebuild are inflated in threads while earlier mods are transformed.
+    reads = jars.read_ahead((mod, [(jar, mod, locales[mod], True), (jar, mod, 'en_us', False)])
+                            for mod, jar in mods if mod in cached and cached[mod] is None)
+    for mod, jar in mods:
+        if locales[mod] is None:
+            print(mod, ' ' * (30-len(mod)), 'Translation file not found, skipping...')
+            continue
+        with stats.measure(LANG, mod, jars):
+            fragment = cached[mod]
+            if fragment is not None:
+                print(mod, ' ' * (30-len(mod)), '☑️ Unchanged.' if locales[mod] == LANG else f'☑️ Unchanged from {locales[mod]}.')
+            else:
+                next(reads)
+                if kbase is None:
+                    kbase = stats.knowledge_base(open_knowledge_base(LANG))
+                fragment = build_mod(LANG, jars, mod, jar, locales[mod], kbase, stats)
+                if fragment is not None:
+                    manifest.save_fragment(fragment_inputs[mod], fragment)
+        if fragment is None:
+            continue
+        english_inputs, english = mod_english(jars, manifest, mod, jar)
+        fragments += [manifest.fragment_name(english_inputs), manifest.fragment_name(fragment_inputs[mod])]
+        out.add(english)
+        out.add(fragment)
+
+    if cache.hits + cache.misses:
+        print(f'♻️ {cache.hits} of {cache.hits + cache.misses} values reused ({cache.hit_rate():.0%})')
+        stats.transform_cache(LANG, cache)
+        cache.save()
+
+    # Legacy lang files are written line by line from the translations, without going through JSON.
+    data = serialise_lang(out.merged()) if legacy else serialise(out.merged(), compact)
+    stats.output(LANG, data)
+    makedirs(dirname(outfilename), exist_ok=True)
+    with open(outfilename, 'wb') as f:
+        f.write(data)
+    return {'inputs': inputs, 'fragments': fragments}, data
 
 if __name__ == '__main__':
-    main()
-    patch_village_names(VERSION_TO_BE_PATCHED)
-    patch_villager_names(VERSION_TO_BE_PATCHED)
\ No newline at end of file
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--jobs', type=int, default=1, help='build languages in parallel with this many processes')
+    parser.add_argument('--force', action='store_true', help='rebuild everything, even if the build manifest says nothing changed')
+    parser.add_argument('--output', choices=('zip', 'folder'), default='zip', help='install the pack as resourcepacks/crammese.zip (default) or as a loose folder')
+    parser.add_argument('--format', choices=('json', 'lang'), help='write JSON lang files, or legacy .lang files for Minecraft 1.12 and older (default: by the version of the instance)')
+    parser.add_argument('--compact', action='store_true', help='write lang files without indentation')
+    parser.add_argument('--stats-json', metavar='PATH', help='count time, jar reads, keys, knowledge base hits and rule firings per language and mod, and write them to PATH (use with --force to count everything)')
+    parser.add_argument('--profile', action='store_true', help='also run each language under cProfile, and print the counts')
+    parser.add_argument('--persist-cache', action='store_true', help='keep the memo of annotated values in knowledgebase/.cache for the next run')
+    parser.add_argument('--all-instances', action='store_true', help='build and install the pack for every CurseForge instance, sharing what instances of the same version or with the same jars have in common')
+    parser.add_argument('--serve', action='store_true', help='run a local web service for lookups and pack downloads, see server.py')
+    parser.add_argument('--host', default='127.0.0.1', help='address to serve on, 0.0.0.0 for the LAN (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=8787, help='port to serve on (default: %(default)s)')
+    parser.add_argument('--diff', action='store_true', help='report the keys that were added, removed or changed in the installed pack, see pack_diff.py')
+    parser.add_argument('--vocabulary', action='store_true', help='also update the index of the words and bigrams of each language, see vocabulary.py')
+    parser.add_argument('--watch', action='store_true', help='keep running, and rebuild when mods, asset indexes or knowledge bases change')
+    args = parser.parse_args()
+
+    instances = list_instances() if args.all_instances else None
+    if not args.watch and not args.serve:
+        main(args.jobs, args.force, args.output, args.compact, args.stats_json, args.profile, args.persist_cache, instances, args.format, args.diff, args.vocabulary)
+    for name in [basename(instance) for instance, version in instances] if instances else [VERSION_TO_BE_PATCHED]:
+        patch_village_names(name)
+        patch_villager_names(name)
+    if args.watch:
+        watch(args.output, args.compact, args.persist_cache, instances, args.format, args.vocabulary)
+    elif args.serve:
+        from server import serve
+        serve(args.host, args.port, args.compact, args.persist_cache, args.format)
\ No newline at end of file
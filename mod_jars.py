@@ -0,0 +1,196 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Index of the mod jars of an instance. Mods are discovered from the jars themselves instead of a hardcoded list: the central directory of every jar in the mods folder is read once, and its `assets/<namespace>/lang/<locale>.json` entries make up a namespace -> jar -> locales table.
+
+The entries of each jar (name, size and CRC) are cached on disk by jar mtime and size, so a rerun only reads the central directory of jars that changed. Jars are only opened to read a lang file, and parsed locale files are cached by size and CRC, so e.g. a mod's `en_us.json` is only parsed once for all languages, and for all instances that have the same jar. `prune` drops the parsed files of jars that are gone from every index of a run, so long-running processes (`--watch`, `--serve`) don't keep every version of every mod.
+
+Builds read the lang files of the mods they rebuild through `read_ahead`: a few threads inflate the next mods' files while the current mod is transformed, so slow or network-mounted instance folders don't stall the build.
+'''
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+from json import dumps, loads
+from os.path import exists
+from re import compile, sub
+from threading import Lock
+from time import perf_counter
+from zipfile import ZipFile
+
+from build_manifest import file_signature, write_atomic
+from legacy_lang import parse_lang
+
+LANG_ENTRY = compile(r'assets/([^/]+)/lang/([^/]+)\.(json|lang)')           # `.lang` before 1.13, e.g. `fr_FR.lang`
+JAR_CACHE = 'resourcepacks/crammese.jars.json'
+JAR_CACHE_VERSION = 2
+VANILLA_NAMESPACE = 'minecraft'                 # Vanilla keys are built from the asset index, not from mod jars.
+READ_THREADS = 4
+READ_AHEAD = 8                                  # Mods whose lang files may be inflated ahead of the build
+
+_parsed = {}                                    # (size, CRC, strip_comments) -> parsed lang file, shared by all indexes
+
+
+class ModJarIndex:
+    def __init__(self, mods_dir, cache_path=JAR_CACHE):
+        self.jars = sorted(glob(f'{mods_dir}/*.jar'))
+        self.cache_path = cache_path
+        self._cache = {}
+        self._dirty = False
+        self._zips = {}
+        self._lock = Lock()
+        self._inflated = {}                     # (size, CRC, strip_comments) -> (content, seconds), read ahead but not parsed yet
+        self._lang_files = {}
+        self.read_seconds = 0                   # Counters for build stats
+        self.bytes_read = 0
+        self.keys_read = 0
+        if cache_path is not None and exists(cache_path):
+            cache = loads(open(cache_path, 'r', encoding='utf-8').read())
+            if cache.get('version') == JAR_CACHE_VERSION:
+                self._cache = cache['jars']
+
+    def open(self, jar):
+        with self._lock:
+            if jar not in self._zips:
+                self._zips[jar] = ZipFile(jar)
+            return self._zips[jar]
+
+    def lang_files(self, jar):
+        '''
+        `{(namespace, locale): [entry name, size, CRC]}` of every lang file in the jar. Locales are lower case, and JSON wins over `.lang` files.
+        '''
+        if jar not in self._lang_files:
+            signature = file_signature(jar)
+            cached = self._cache.get(jar)
+            if cached is not None and cached['signature'] == signature:
+                files = {tuple(key.split('/')): entry for key, entry in cached['lang'].items()}
+            else:
+                files = {}
+                for info in self.open(jar).infolist():
+                    match = LANG_ENTRY.fullmatch(info.filename)
+                    if match:
+                        namespace, locale, extension = match.groups()
+                        if extension == 'json' or (namespace, locale.lower()) not in files:
+                            files[(namespace, locale.lower())] = [info.filename, info.file_size, info.CRC]
+                self._cache[jar] = {'signature': signature, 'lang': {'/'.join(key): entry for key, entry in files.items()}}
+                self._dirty = True
+            self._lang_files[jar] = files
+        return self._lang_files[jar]
+
+    def table(self):
+        '''
+        `{namespace: {jar: [locale, ...]}}` of every lang file in the mods folder.
+        '''
+        table = {}
+        for jar in self.jars:
+            for namespace, locale in sorted(self.lang_files(jar)):
+                table.setdefault(namespace, {}).setdefault(jar, []).append(locale)
+        return table
+
+    def mods(self):
+        '''
+        `(namespace, jar)` of every mod with English strings, sorted by namespace. If several jars ship the same namespace, the first one wins.
+        '''
+        return sorted((namespace, next(jar for jar, locales in jars.items() if 'en_us' in locales))
+                      for namespace, jars in self.table().items()
+                      if namespace != VANILLA_NAMESPACE and any('en_us' in locales for locales in jars.values()))
+
+    def locales(self, jar, namespace):
+        return {locale for ns, locale in self.lang_files(jar) if ns == namespace}
+
+    def signature(self, jar, namespace, locale):
+        '''
+        Size and CRC of a lang file from the central directory, without reading it.
+        '''
+        return self.lang_files(jar)[(namespace, locale)][1:]
+
+    def read(self, jar, namespace, locale, strip_comments=False):
+        '''
+        Parsed lang file. Raises `KeyError` if the jar has no such file. The returned dict is shared between callers, don't modify it.
+        '''
+        name, size, crc = self.lang_files(jar)[(namespace, locale)]
+        key = (size, crc, strip_comments)
+        if key not in _parsed:
+            content, seconds = self._inflated.pop(key, None) or self._inflate(jar, name)
+            self.read_seconds += seconds
+            self.bytes_read += len(content)
+            content = content.decode('utf-8')
+            if name.endswith('.lang'):
+                _parsed[key] = parse_lang(content.splitlines())
+            else:
+                _parsed[key] = loads(sub('//.*', '', content) if strip_comments else content)
+        self.keys_read += len(_parsed[key])
+        return _parsed[key]
+
+    def referenced(self):
+        '''
+        `(size, CRC)` of every lang file of the jars, see `prune`.
+        '''
+        return {(size, crc) for jar in self.jars for name, size, crc in self.lang_files(jar).values()}
+
+    def _inflate(self, jar, name):
+        start = perf_counter()
+        content = self.open(jar).read(name)
+        return content, perf_counter() - start
+
+    def read_ahead(self, requests, threads=READ_THREADS, depth=READ_AHEAD):
+        '''
+        Yields the item of each `(item, [(jar, namespace, locale, strip_comments), ...])` request once its lang files are inflated, so that `read` only has to parse them. Files are read by `threads` threads (zlib releases the GIL), at most `depth` requests ahead of the caller. Files that fail to read are left to `read`, which raises the error.
+        '''
+        def inflate(files):
+            inflated = {}
+            for jar, namespace, locale, strip_comments in files:
+                name, size, crc = self.lang_files(jar)[(namespace, locale)]
+                if (size, crc, strip_comments) not in _parsed:
+                    try:
+                        inflated[(size, crc, strip_comments)] = self._inflate(jar, name)
+                    except Exception:
+                        pass
+            return inflated
+
+        requests = iter(requests)
+        with ThreadPoolExecutor(threads) as pool:
+            window = deque()
+            for item, files in requests:
+                window.append((item, pool.submit(inflate, files)))
+                if len(window) >= depth:
+                    break
+            try:
+                while window:
+                    item, future = window.popleft()
+                    self._inflated.update(future.result())
+                    for next_item, files in requests:
+                        window.append((next_item, pool.submit(inflate, files)))
+                        break
+                    yield item
+            finally:
+                self._inflated.clear()
+
+    def save(self):
+        '''
+        Writes the jar cache if any jar was (re)read, dropping jars that are gone.
+        '''
+        if self.cache_path is None or not self._dirty:
+            return
+        jars = {jar: entry for jar, entry in self._cache.items() if jar in self._lang_files or exists(jar)}
+        write_atomic(self.cache_path, dumps({'version': JAR_CACHE_VERSION, 'jars': jars}))
+        self._dirty = False
+
+    def close(self):
+        for z in self._zips.values():
+            z.close()
+        self._zips.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def prune(referenced):
+    '''
+    Drops the parsed lang files that no jar has any more, e.g. those of an updated mod, `referenced` being the `referenced()` of the indexes of every instance.
+    '''
+    for key in [key for key in _parsed if key[:2] not in referenced]:
+        del _parsed[key]
@@ -6,70 +6,30 @@ Adds indefinite article with grammatical gender in front of each item/block name
 Uses the indefinite article instead of definite article because of epenthesis and elision rules.
 '''
 
-from glob import glob
+from argparse import ArgumentParser
 from json import loads
 from os.path import exists, expanduser
-from pickle import dump
-from re import sub
 from traceback import format_exc
-from zipfile import ZipFile
 
-from requests import get
+from asset_index import lang_hashes, object_path
+from german_compounds import HeadNounTrie
+from kaikki import KAIKKI_URL, KaikkiFetcher, genders_from_dump
+from key_categories import matches
+from knowledge_base import KnowledgeBase, knowledge_base_path, write_knowledge_base
+from mod_jars import ModJarIndex
+from vocabulary import translation_sources, update_vocabulary
 
 ##################################################
 #    User Config
 ##################################################
 LANG = 'fr_fr'
+VERSION_TO_BE_PATCHED = '1.21'
 
 ##################################################
 #    Constants
 ##################################################
 CURSEFORGE_INSTALLED = exists(expanduser('~/curseforge/minecraft'))    # False
 LEAPFROG = '1.21'                               # Leapfrog to the latest translation, e.g., 1.20.6 using 1.21's updated translation.
-SUPPORTED_MOD_LIST = ('advancementframes',      # It doesn't matter if some mods are not installed, the script will skip them.
-            'betterlily',
-            'betterpvp',
-            'biomesoplenty',
-            'cfm',
-            'comforts',
-            'croptopia',
-            'curios',
-            'dummmmmmy',
-            'explorerscompass',
-            'farmersdelight',
-            'goated',
-            'hauntedharvest',
-            'heartstone',
-            'jade',
-            'jeed',
-            'jei',
-            'labels',
-            'map_atlases',
-            'mcw-bridges',
-            'mcw-doors',
-            'mcw-fences',
-            'mcw-lights',
-            'mcw-paintings',
-            'mcw-paths',
-            'mcw-roofs',
-            'mcw-trapdoors',
-            'mcw-windows',
-            'modmenu',
-            'moonlight',
-            'moyai',
-            'naturescompass',
-            'oculus',
-            'polytone',
-            'sereneseasons',
-            'sleep_tight',
-            'smarterfarmers',
-            'snowyspirit',
-            'supplementaries',
-            'suppsquared',
-            'terralith',
-            'toughasnails',
-            'wthit',
-            'xaeros_minimap',)
 
 if CURSEFORGE_INSTALLED:
     MC_HOME = expanduser('~/curseforge/minecraft/Install')
@@ -78,10 +38,13 @@ if CURSEFORGE_INSTALLED:
 else:
     MC_HOME = MC_MODS = expanduser('~/AppData/Roaming/.minecraft')
 
+VANILLA_NAMES = {'item': 'minecraft', 'block': 'minecraft', 'entity': 'minecraft'}    # Key categories whose first word goes to the knowledge base, see `key_categories`
+MOD_NAMES = {'item': None, 'block': None, 'entity': None}
+
 ##################################################
 #    Build Knowledge Base
 ##################################################
-def build_knowledge_base(VERSION_TO_BE_PATCHED = '1.21'):
+def build_knowledge_base(VERSION_TO_BE_PATCHED = '1.21', base_url=KAIKKI_URL, workers=16, dump=None, frequent=None):
     lang_directory = None
 
     if LANG[:2] == 'fr':
@@ -93,49 +56,70 @@ def build_knowledge_base(VERSION_TO_BE_PATCHED = '1.21'):
     else:
         raise Exception('⛔ Language not supported.')
 
-    # TODO: find latest file, not hardcoding '5' and '1.20'
-    # hash = loads(open(expanduser('~/AppData/Roaming/.minecraft/assets/indexes/1.19.json'), 'r', encoding='utf-8').read())['objects']['minecraft/lang/en_gb.json']['hash']
-    hash = loads(open(f'{MC_HOME}/assets/indexes/16.json', 'r',
-                 encoding='utf-8').read())['objects'][f'minecraft/lang/{LANG}.json']['hash']
+    hash = lang_hashes(MC_HOME, LEAPFROG)[LANG]
     print('Hash found: ', hash)
 
-    trans = loads(open(
-        f'{MC_HOME}/assets/objects/{hash[:2]}/{hash}', 'r', encoding='utf-8').read())
+    trans = loads(open(object_path(MC_HOME, hash), 'r', encoding='utf-8').read())
 
-    words = [trans[k].split(' ')[0].lower() if lang_directory != 'German' else trans[k].split(' ')[0].split('-')[-1] for k in trans if len(trans[k].split(' ')[0]) > 2 and (k.startswith(
-        'item.minecraft') or k.startswith('block.minecraft') or k.startswith('entity.minecraft'))]
+    words = [trans[k].split(' ')[0].lower() if lang_directory != 'German' else trans[k].split(' ')[0].split('-')[-1] for k in trans if len(trans[k].split(' ')[0]) > 2 and matches(k, VANILLA_NAMES)]
 
-    for mod in SUPPORTED_MOD_LIST:
+    jars = ModJarIndex(f'{MC_MODS}/mods')
+    for mod, jar in jars.mods():
+        if LANG not in jars.locales(jar, mod):
+            continue
         try:
-            mod_trans_json_str = sub('//.*', '', ZipFile(glob(f'{MC_MODS}/mods/{mod}*.jar')[0]).open(f'assets/{mod.replace("-", "").replace("trap", "trp").replace(
-                "wthit", "waila").replace("xaeros_", "xaero").replace("betterpvp", "xaerobetterpvp").replace("oculus", "iris")}/lang/{LANG}.json').read().decode('utf-8'))
-            mod_trans = loads(mod_trans_json_str)
+            mod_trans = jars.read(jar, mod, LANG, strip_comments=True)
             new = sorted(set([mod_trans[k].split(' ')[0].lower() if lang_directory != 'German' else mod_trans[k].split(' ')[0].split('-')[-1] for k in mod_trans if len(mod_trans[k].split(
-                ' ')[0]) > 2 and (k.startswith('item.') or k.startswith('block.') or k.startswith('entity.'))]))
+                ' ')[0]) > 2 and matches(k, MOD_NAMES)]))
             print(new)
             words += new
-        except Exception as e:
+        except Exception:
             print(mod, format_exc())
     words = sorted(set(words))
+    # Most frequent words first, so that an interrupted or `frequent` run has looked up the words seen most in game.
+    vocabulary = update_vocabulary(LANG, LANG, translation_sources(jars, MC_HOME, hash, {mod: LANG if LANG in jars.locales(jar, mod) else None for mod, jar in jars.mods()}))
+    words.sort(key=lambda word: -vocabulary.count(word))
+    vocabulary.close()
+    jars.save()
+    jars.close()
     print(words)
 
     worddict = {}
-    for word in words:
-        print(word)
-        try:
-            url = f'https://kaikki.org/dictionary/{lang_directory}/meaning/{word[0]}/{word[:2]}/{word}.json'
-            print(url)
-            res = get(url)
-            tags = loads([x for x in res.text.split('\n') if x.startswith(
-                '{"pos": "noun')][0])['senses'][0]['tags']
-            out_display = 'p' if 'plural' in tags else (
-                'm' if 'masculine' in tags else ('n' if 'neuter' in tags else ('f' if 'feminine' in tags else None)))
-            worddict[word] = out_display
-        except:
-            print('🚫', word, 'failed')
-    with open(f'knowledgebase/mc_{LANG}.pickle', 'wb') as f:
-        dump(worddict, f)
+    if frequent is not None and exists(knowledge_base_path(LANG)):
+        # Keep the known genders, and only look up the most frequent words that are missing.
+        kbase = KnowledgeBase(knowledge_base_path(LANG))
+        worddict = dict(kbase.items())
+        words = [word for word in words if kbase.get(word) is None][:frequent]
+        kbase.close()
+        print(f'{len(worddict)} words known, looking up the {len(words)} most frequent unknown words')
+
+    if dump is not None:
+        lookup = lambda words: genders_from_dump(dump, words)
+    else:
+        fetcher = KaikkiFetcher(lang_directory, base_url=base_url, workers=workers)
+        lookup = fetcher.genders
+
+    if lang_directory == 'German' and dump is None:
+        # Look up head nouns first. Compounds of a head noun with a known gender don't need their own entry, `main` gets their gender from the head noun.
+        # Not worth a second scan of a dump, where looking up a word costs nothing.
+        candidates = HeadNounTrie((word, None) for word in words)
+        heads = [word for word in words if not candidates.heads(word)]
+        worddict.update(lookup(heads))
+        trie = HeadNounTrie(worddict.items())
+        words = [word for word in words if word not in worddict and trie.gender(word) is None and candidates.heads(word)]
+        print(f'{len(heads)} head nouns, {len(words)} compounds left to look up')
+    worddict.update(lookup(words))
+    if dump is None:
+        fetcher.close()
+    write_knowledge_base(knowledge_base_path(LANG), worddict, LANG)
     print(worddict)
 
 if __name__ == '__main__':
-    build_knowledge_base()
\ No newline at end of file
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--base-url', default=KAIKKI_URL, help='kaikki.org mirror, e.g. a local stand-in server')
+    parser.add_argument('--workers', type=int, default=16, help='concurrent requests')
+    parser.add_argument('--frequent', type=int, metavar='N', help='keep the knowledge base, and only look up the N most frequent words it has no gender for, see vocabulary.py')
+    parser.add_argument('--dump', help='read genders from a local kaikki.org JSONL dump (optionally gzipped) instead of fetching them')
+    args = parser.parse_args()
+
+    build_knowledge_base(base_url=args.base_url, workers=args.workers, dump=args.dump, frequent=args.frequent)
\ No newline at end of file
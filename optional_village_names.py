@@ -8,7 +8,7 @@ e.g., on Windows, folder containing replaced file (replace 1.21 w/ any version)
 
 from json import dumps
 from re import sub
-from os.path import expanduser
+from os.path import exists, expanduser
 
 OUT = {               # Customise for your own needs. This works like flashcards, content can be Incoterms, Docker commands or whatever.
     "area_names": [
@@ -127,15 +127,21 @@ def patch_village_names(VERSION_TO_BE_PATCHED = '1.20.6'):
     REPLACE_PATH = expanduser(
         f"~/curseforge/minecraft/Instances/{VERSION_TO_BE_PATCHED}/config/collective/area_names.json")
 
+    CONFIG_PATH = expanduser(
+        f"~/curseforge/minecraft/Instances/{VERSION_TO_BE_PATCHED}/config/areas.json5")
+    if not exists(CONFIG_PATH):
+        print('Mod not installed in this instance, skipping...')
+        return
+
     # Change configuration
     content = None
-    with open(expanduser(f"~/curseforge/minecraft/Instances/1.21/config/areas.json5"), 'r+', encoding='utf-8') as f:
+    with open(CONFIG_PATH, 'r+', encoding='utf-8') as f:
         content = f.read()
         content = sub('(?<="sendChatMessages": ).*?(?=,)', 'true', content)
         content = sub('(?<="enterPrefix": ").*?(?=")', 'Vous entrez à ', content)
         content = sub('(?<="leavePrefix": ").*?(?=")', 'Vous quittez ', content)
         # print(content)
-    with open(expanduser(f"~/curseforge/minecraft/Instances/1.21/config/areas.json5"), 'w', encoding='utf-8') as f:
+    with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
         f.write(content)
 
     open(REPLACE_PATH, 'w', encoding='utf-8').write(dumps(OUT, indent=2))
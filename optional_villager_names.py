@@ -7,7 +7,7 @@ e.g., on Windows, folder containing replaced file (replace 1.21 w/ any version)
 '''
 
 from json import dumps
-from os.path import expanduser
+from os.path import exists, expanduser
 from re import sub
 
 OUT = {                         # Customise for your own needs. This works like flashcards, content can be Incoterms, Docker commands or whatever.
@@ -124,13 +124,19 @@ def patch_villager_names(VERSION_TO_BE_PATCHED = '1.20.6'):
     REPLACE_PATH = expanduser(
         f"~/curseforge/minecraft/Instances/{VERSION_TO_BE_PATCHED}/config/collective/entity_names.json")
 
+    CONFIG_PATH = expanduser(
+        f"~/curseforge/minecraft/Instances/{VERSION_TO_BE_PATCHED}/config/villagernames.json5")
+    if not exists(CONFIG_PATH):
+        print('Mod not installed in this instance, skipping...')
+        return
+
     # Change configuration
     content = None
-    with open(expanduser(f"~/curseforge/minecraft/Instances/1.21/config/villagernames.json5"), 'r+', encoding='utf-8') as f:
+    with open(CONFIG_PATH, 'r+', encoding='utf-8') as f:
         content = f.read()
         content = sub('(?<="shouldCapitalizeNames": ).*', 'false', content)
         # print(content)
-    with open(expanduser(f"~/curseforge/minecraft/Instances/1.21/config/villagernames.json5"), 'w', encoding='utf-8') as f:
+    with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
         f.write(content)
 
     open(REPLACE_PATH, 'w', encoding='utf-8').write(dumps(OUT, indent=2))
@@ -0,0 +1,47 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+A lang file as a stack of layers instead of one dict per language: vanilla English, the translated vanilla keys, then the English and the translated keys of each mod. Later layers win.
+
+The English layers are parsed once and shared by all languages, and translation layers only hold the keys that differ from the English, so memory grows with the number of translated keys. Layers are never modified, they're only merged when the lang file is serialised.
+'''
+
+
+class Overlay:
+    def __init__(self, layers=()):
+        self.layers = list(layers)
+
+    def add(self, layer):
+        self.layers.append(layer)
+
+    def get(self, key, default=None):
+        for layer in reversed(self.layers):
+            if key in layer:
+                return layer[key]
+        return default
+
+    def __getitem__(self, key):
+        for layer in reversed(self.layers):
+            if key in layer:
+                return layer[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return any(key in layer for layer in self.layers)
+
+    def __iter__(self):
+        seen = set()
+        for layer in self.layers:
+            for key in layer:
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+    def __len__(self):
+        return len(set().union(*self.layers))
+
+    def merged(self):
+        out = {}
+        for layer in self.layers:
+            out.update(layer)
+        return out
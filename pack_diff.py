@@ -0,0 +1,145 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Key-level diff between two builds of the pack: which keys of each lang file were added, removed or annotated differently, counted by mod namespace and by key category (see `key_categories`).
+
+Each side is a pack zip, a pack folder or a single lang file, JSON or `.lang`. Values are reduced to 8-byte hashes as soon as a file is parsed, so only one parsed file is in memory at a time, and files are compared in one pass over their keys.
+
+Usage: python3 pack_diff.py old/cm_fr.json resourcepacks/crammese/assets/minecraft/lang/cm_fr.json [--json] [--keys 20]
+'''
+
+from argparse import ArgumentParser
+from hashlib import blake2b
+from json import dumps, loads
+from os import walk
+from os.path import basename, exists, isdir, relpath
+from re import compile
+from zipfile import ZipFile, is_zipfile
+
+from key_categories import classify
+from legacy_lang import parse_lang
+
+LANG_FILE = compile(r'assets/[^/]+/lang/[^/]+\.(?:json|lang)')
+CHANGES = ('added', 'removed', 'changed')
+KEYS_SHOWN = 10
+GROUPS_SHOWN = 12
+
+
+def read_pack(path):
+    '''
+    `{name: bytes}` of the lang files of a pack zip or folder, or of a single lang file. A pack that doesn't exist yet is empty.
+    '''
+    if isdir(path):
+        files = {}
+        for folder, _, filenames in walk(path):
+            for filename in filenames:
+                name = relpath(f'{folder}/{filename}', path).replace('\\', '/')
+                if LANG_FILE.fullmatch(name):
+                    files[name] = open(f'{folder}/{filename}', 'rb').read()
+        return files
+    if not exists(path):
+        return {}
+    if is_zipfile(path):
+        with ZipFile(path) as z:
+            return {name: z.read(name) for name in z.namelist() if LANG_FILE.fullmatch(name)}
+    return {basename(path): open(path, 'rb').read()}
+
+
+def value_hashes(name, data):
+    '''
+    `{key: hash of its value}` of a serialised lang file.
+    '''
+    text = data.decode('utf-8-sig')
+    values = parse_lang(text.splitlines()) if name.endswith('.lang') else loads(text)
+    return {key: blake2b(value.encode('utf-8'), digest_size=8).digest() for key, value in values.items()}
+
+
+def diff_files(old, new):
+    '''
+    Added, removed and changed keys between two `{key: hash}`, in one pass over each.
+    '''
+    diff = {change: [] for change in CHANGES}
+    unchanged = 0
+    for key, hash in new.items():
+        previous = old.get(key)
+        if previous is None:
+            diff['added'].append(key)
+        elif previous != hash:
+            diff['changed'].append(key)
+        else:
+            unchanged += 1
+    diff['removed'] = [key for key in old if key not in new]
+    diff['unchanged'] = unchanged
+    return diff
+
+
+def namespace(key, namespaces):
+    '''
+    Mod namespace of a key: from its category (`item.cfm.sofa`), or its first or second segment if that is a known namespace (`cfm.gui.title`, `config.jade.title`), else `minecraft`, e.g. for `enchantment.level.1`.
+    '''
+    category, ns = classify(key)
+    if ns is not None and ns in namespaces:
+        return ns
+    for segment in key.split('.', 2)[:2]:
+        if segment in namespaces:
+            return segment
+    return 'minecraft'
+
+
+def diff_packs(old_pack, new_pack, namespaces=None):
+    '''
+    Report of the changes of every lang file: counts, counts by namespace and by category, and the changed keys. Mod namespaces are those of `namespaces`, e.g. the discovered mods, else those seen in item, block etc. keys.
+    '''
+    report = {}
+    if len(old_pack) == len(new_pack) == 1 and old_pack.keys() != new_pack.keys():
+        old_pack = {next(iter(new_pack)): next(iter(old_pack.values()))}        # Two single files under different names
+    for name in sorted(old_pack.keys() | new_pack.keys()):
+        old = value_hashes(name, old_pack[name]) if name in old_pack else {}
+        new = value_hashes(name, new_pack[name]) if name in new_pack else {}
+        diff = diff_files(old, new)
+        known = namespaces if namespaces is not None else {classify(key)[1] for keys in (old, new) for key in keys}
+        del old, new
+        entry = {change: len(diff[change]) for change in CHANGES}
+        entry['unchanged'] = diff['unchanged']
+        entry['by_namespace'], entry['by_category'] = {}, {}
+        for change in CHANGES:
+            for key in diff[change]:
+                for group, label in (('by_namespace', namespace(key, known)), ('by_category', classify(key)[0])):
+                    counts = entry[group].setdefault(label, {c: 0 for c in CHANGES})
+                    counts[change] += 1
+        for group in ('by_namespace', 'by_category'):
+            entry[group] = dict(sorted(entry[group].items(), key=lambda item: -sum(item[1].values())))
+        entry['keys'] = {change: sorted(diff[change]) for change in CHANGES}
+        report[name] = entry
+    return report
+
+
+def format_report(report, keys=KEYS_SHOWN):
+    lines = []
+    for name, entry in report.items():
+        if not any(entry[change] for change in CHANGES):
+            lines.append(f'{name}: unchanged ({entry["unchanged"]} keys)')
+            continue
+        lines.append(f'{name}: +{entry["added"]} -{entry["removed"]} ~{entry["changed"]} ({entry["unchanged"]} unchanged)')
+        for group in ('by_namespace', 'by_category'):
+            groups = [f'{label} +{c["added"]} -{c["removed"]} ~{c["changed"]}' for label, c in entry[group].items()]
+            more = [f'{len(groups) - GROUPS_SHOWN} more'] if len(groups) > GROUPS_SHOWN else []
+            lines.append(f'  {group[3:]}: ' + ', '.join(groups[:GROUPS_SHOWN] + more))
+        for change, sign in zip(CHANGES, '+-~'):
+            shown = entry['keys'][change][:keys]
+            for key in shown:
+                lines.append(f'  {sign} {key}')
+            if len(entry['keys'][change]) > len(shown):
+                lines.append(f'  {sign} ... {len(entry["keys"][change]) - len(shown)} more')
+    return '\n'.join(lines)
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('old', help='previous pack zip, pack folder or lang file')
+    parser.add_argument('new', help='new pack zip, pack folder or lang file')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--keys', type=int, default=KEYS_SHOWN, help='changed keys listed per change and file in the text report')
+    args = parser.parse_args()
+
+    report = diff_packs(read_pack(args.old), read_pack(args.new))
+    print(dumps(report, indent=2, ensure_ascii=False) if args.json else format_report(report, args.keys))
@@ -0,0 +1,106 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Writes the resource pack as a single zip. Lang files are serialised once, with sorted keys and optionally without indentation, and the zip is deterministic: members are sorted and carry a fixed timestamp, so the same translations always give the same bytes.
+
+The zip is written to a temporary file and atomically renamed into the instance, so Minecraft never sees a half-written pack. Members of the previous zip that are unchanged, or that the build could have written but didn't (e.g. a language that failed to build), are carried over as they are, still compressed, and if nothing changed the previous zip is left alone. Other members are dropped, e.g. `.json` lang files after switching to `.lang`. The zip is written by hand for that, `zipfile` can only write members it compresses itself.
+'''
+
+from io import SEEK_CUR, BytesIO
+from json import dumps
+from os import replace
+from os.path import exists
+from struct import Struct
+from zipfile import ZIP_DEFLATED, ZipFile, is_zipfile
+from zlib import DEFLATED, Z_DEFAULT_COMPRESSION, compressobj, crc32
+
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+DOS_DATE = (ZIP_DATE[0] - 1980) << 9 | ZIP_DATE[1] << 5 | ZIP_DATE[2]
+DOS_TIME = ZIP_DATE[3] << 11 | ZIP_DATE[4] << 5 | ZIP_DATE[5] // 2
+LOCAL_HEADER = Struct('<4s5H3L2H')
+CENTRAL_HEADER = Struct('<4s6H3L5H2L')
+END_RECORD = Struct('<4s4H2LH')
+LOCAL_SIGNATURE, CENTRAL_SIGNATURE, END_SIGNATURE = b'PK\x03\x04', b'PK\x01\x02', b'PK\x05\x06'
+UTF8_NAME = 0x800
+
+
+def serialise(out, compact=False):
+    if compact:
+        return dumps(out, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return dumps(out, indent=2, sort_keys=True).encode('utf-8')
+
+
+def write_pack_zip(path, members, keep=()):
+    '''
+    Writes `{member name: bytes}` to the zip at `path`, keeping the members of `keep` of the previous zip that aren't in `members`. Returns whether the zip changed.
+    '''
+    entries = {}
+    previous = _previous_entries(path)
+    for name, data in members.items():
+        entry = previous.get(name)
+        # Members that didn't change are copied compressed, without inflating and deflating them again.
+        entries[name] = entry if entry is not None and entry[4] == len(data) and entry[2] == crc32(data) else _entry(data)
+    for name in previous.keys() & set(keep) - members.keys():
+        entries[name] = previous[name]
+    if previous.keys() == entries.keys() and all(entries[name] is previous[name] for name in entries):
+        return False
+
+    with open(f'{path}.tmp', 'wb') as f:
+        _write_entries(f, entries)
+    replace(f'{path}.tmp', path)
+    return True
+
+
+def pack_bytes(members):
+    '''
+    The same zip in memory, e.g. to be served over HTTP.
+    '''
+    buffer = BytesIO()
+    _write_entries(buffer, {name: _entry(data) for name, data in members.items()})
+    return buffer.getvalue()
+
+##################################################
+#    Zip Entries
+##################################################
+# An entry is `(method, flags, CRC, compressed data, size)`.
+def _entry(data):
+    deflate = compressobj(Z_DEFAULT_COMPRESSION, DEFLATED, -15)
+    return (ZIP_DEFLATED, 0, crc32(data), deflate.compress(data) + deflate.flush(), len(data))
+
+
+def _previous_entries(path):
+    '''
+    Entries of the zip at `path` with their compressed data as it is, or none if there's no readable zip.
+    '''
+    if not exists(path) or not is_zipfile(path):
+        return {}
+    entries = {}
+    with ZipFile(path) as z, open(path, 'rb') as f:
+        for info in z.infolist():
+            f.seek(info.header_offset)
+            header = LOCAL_HEADER.unpack(f.read(LOCAL_HEADER.size))
+            f.seek(header[9] + header[10], SEEK_CUR)            # Name and extra field
+            entries[info.filename] = (info.compress_type, info.flag_bits & UTF8_NAME, info.CRC, f.read(info.compress_size), info.file_size)
+    return entries
+
+
+def _write_entries(file, entries):
+    '''
+    Writes the entries as a zip, sorted by name, with a fixed timestamp.
+    '''
+    offset = 0
+    directory = []
+    for name in sorted(entries):
+        method, flags, crc, data, size = entries[name]
+        encoded = name.encode('utf-8')
+        if not encoded.isascii():
+            flags |= UTF8_NAME
+        header = LOCAL_HEADER.pack(LOCAL_SIGNATURE, 20, flags, method, DOS_TIME, DOS_DATE, crc, len(data), size, len(encoded), 0)
+        file.write(header + encoded)
+        file.write(data)
+        directory.append(CENTRAL_HEADER.pack(CENTRAL_SIGNATURE, 3 << 8 | 20, 20, flags, method, DOS_TIME, DOS_DATE, crc, len(data), size,
+                                             len(encoded), 0, 0, 0, 0, 0o644 << 16, offset) + encoded)
+        offset += len(header) + len(encoded) + len(data)
+    central = b''.join(directory)
+    file.write(central)
+    file.write(END_RECORD.pack(END_SIGNATURE, 0, 0, len(directory), len(directory), len(central), offset, 0))
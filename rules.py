@@ -0,0 +1,241 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Memory-aid rewrite rules, compiled once per language.
+
+Every rule of a language (literal replacements like `iencia` -> `` `iencia `` and the regex rules like silent `h` -> `<h>`) is folded into a single alternation regex, so that a value is rewritten in one left-to-right scan instead of one full string copy per rule.
+'''
+
+from collections import Counter
+from functools import lru_cache
+from re import compile, escape, sub
+
+from transform_cache import transform_cache
+
+RULES_VERSION = 3                               # Bump whenever a rule below changes, so cached build outputs are invalidated.
+
+##################################################
+#    Rule Tables
+##################################################
+# Each table is an ordered list of `(regex, replacement)`. The order is the order the rules used to be chained in, and it decides which rule wins when two of them match at the same position.
+SPANISH_RULES = [(escape(x), f'`{x}') for x in ('iencio', 'iencia', 'ienso', 'iensa', 'iense', 'iento', 'ienta', 'iente',
+                                                 'iende', 'iando', 'ianda', 'uevo', 'ueva', 'ueve', 'ier', 'uer')] + [
+    ('v', 'v(b)'),
+    ('H', '<H>'),
+    ('V', 'V(B)'),
+    ('(?<![CSPcsp])h', '<h>'),                  # Silent `h`, but not in `ch`, `sh`, `ph`.
+]
+
+FRENCH_RULES = [
+    ('(?<![CSPcsp])H', '<H>'),
+    ('(?<![CSPcsp])h', '<h>'),
+    ('mp(?=$| )', '<mp>'),
+    ('iz(?=$| )', 'i<z>'),
+    ('ufs', '<ufs>'),
+]
+
+# Typos and false friends that only show up in mod translations. They were fixed around the French rules, in this order.
+FRENCH_MOD_RULES = [(escape('éé'), 'é')] + FRENCH_RULES[:-1] + [
+    (escape(' de vérification'), ' à damiers'),
+    (escape('Block '), 'Bloc '),
+    FRENCH_RULES[-1],                           # `ufs`
+    (escape('Pattes'), 'Pâtes'),
+]
+
+GERMAN_MOD_SPELLING = {'Kokusnuss': 'Kokosnuss'}
+
+# Silent `-nt` of 3rd person plural verbs, e.g. `qui peuve<nt>`.
+FRENCH_VERB_PLURAL = compile(r' qui (?:se )?[a-zéèç"]+nt(?= |$|\.)')
+
+ARTICLES = {
+    'fr': {'m': 'Un', 'f': 'Une', 'p': 'Des'},
+    'de': {'m': 'Der', 'f': 'Die', 'n': 'Das', 'p': '(pl.)'},
+}
+
+##################################################
+#    Transformer
+##################################################
+def _literal(pattern):
+    literal = sub(r'\\(.)', r'\1', pattern)
+    return literal if escape(literal) == pattern else None
+
+
+def chain(rules, value):
+    '''
+    The value rewritten by each rule in turn, like the `str.replace` chain did. The transformer has to give the same result in one scan.
+    '''
+    for pattern, replacement in rules:
+        value = compile(pattern).sub(lambda match: replacement, value)
+    return value
+
+
+def overlaps(rules):
+    '''
+    Texts where two literal rules overlap, e.g. `Block de vérification` for `Block ` and ` de vérification`. One scan would consume the first literal and miss the second, so these texts get a rule of their own.
+    '''
+    literals = [literal for literal in (_literal(pattern) for pattern, _ in rules) if literal is not None]
+    texts = set()
+    for i, a in enumerate(literals):
+        for j, b in enumerate(literals):
+            if i == j:
+                continue                        # `str.replace` doesn't overlap a literal with itself either
+            for k in range(1, min(len(a), len(b))):
+                if a[-k:] == b[:k]:
+                    texts.add(a + b[k:])
+    return sorted(texts, key=lambda text: (-len(text), text))
+
+
+class Transformer:
+    '''
+    All rules of one language as one regex. Literal replacements are pre-composed with the literal rules chained after them (e.g. `uevo` -> `` `uev(b)o ``), which is what the sequential `str.replace` chain used to produce. Texts where literal rules overlap come first, rewritten as the chain did.
+    '''
+
+    def __init__(self, rules, verb_plural=False):
+        alternatives = []
+        self.replacements = {}
+        self.names = {'verb': 'qui ...nt'}
+        self.firings = None                         # Counter of fired rules while stats are collected
+        for i, text in enumerate(overlaps(rules)):
+            self.replacements[f'o{i}'] = chain(rules, text)
+            self.names[f'o{i}'] = text
+            alternatives.append(f'(?P<o{i}>{escape(text)})')
+        for i, (pattern, replacement) in enumerate(rules):
+            for later_pattern, later_replacement in rules[i + 1:]:
+                literal = _literal(later_pattern)
+                if literal is not None:
+                    replacement = replacement.replace(literal, later_replacement)
+            self.replacements[f'r{i}'] = replacement
+            self.names[f'r{i}'] = _literal(pattern) or pattern
+            alternatives.append(f'(?P<r{i}>{pattern})')
+        self.inner = compile('|'.join(alternatives))
+        self.pattern = compile('|'.join([f'(?P<verb>{FRENCH_VERB_PLURAL.pattern})'] + alternatives)) if verb_plural else self.inner
+
+    def _replace(self, match):
+        if self.firings is not None:
+            self.firings[match.lastgroup] += 1
+        if match.lastgroup == 'verb':
+            # The `qui ...nt` rule used to run after every other rule, so only mark the ending if the rewritten phrase still looks like a verb.
+            phrase = self.inner.sub(self._replace, match.group())
+            return phrase[:-2] + '<nt>' if FRENCH_VERB_PLURAL.fullmatch(phrase) else phrase
+        return self.replacements[match.lastgroup]
+
+    def __call__(self, value):
+        return self.pattern.sub(self._replace, value)
+
+
+@lru_cache(maxsize=None)
+def get_transformer(lang, mod=False):
+    if lang.startswith('es_'):
+        return Transformer(SPANISH_RULES)
+    if lang.startswith('fr_'):
+        return Transformer(FRENCH_MOD_RULES if mod else FRENCH_RULES, verb_plural=True)
+    if lang.startswith('ja_'):
+        try:
+            from japanese import japanese_readings
+        except ImportError:
+            print('⚠️ pykakasi is not installed, Japanese is left without readings.')
+            return None
+        return japanese_readings()
+    return None
+
+
+def prepare(lang, values, mod=False):
+    '''
+    Lets transformers that convert words rather than apply rules (Japanese readings) convert all values of a lang file in one go.
+    '''
+    transformer = get_transformer(lang, mod)
+    if hasattr(transformer, 'prepare'):
+        transformer.prepare(values)
+
+##################################################
+#    Annotation
+##################################################
+def add_article(lang, value, kbase, mod=False):
+    '''
+    Prepends the article of the first word's grammatical gender, if the knowledge base knows it.
+    '''
+    spl = value.split(' ')
+    firstword = spl[0].lower() if lang.startswith('fr_') else spl[0]
+    if mod and lang.startswith('de_'):
+        firstword = GERMAN_MOD_SPELLING.get(firstword, firstword)
+    rest = ' '.join(spl[1:])
+    if rest != '':
+        rest = f' {rest}'
+    article = ARTICLES.get(lang[:2], {}).get(kbase.get(firstword))
+    if article is None:
+        return value
+    return f'{article} {firstword}{rest}'
+
+
+def annotate(lang, foreign, english, kbase=None, gendered=False, mod=False):
+    '''
+    Returns the crammese value of one key: the annotated foreign text followed by the English text, or just the English text if there's nothing to learn. Values are memoised per language, see `transform_cache`.
+
+    While stats are collected, what a value counted (knowledge base hits and misses, rule firings) is kept with it and counted again on memo hits, so the counters of a mod don't depend on what was built before it.
+    '''
+    gendered = gendered and kbase is not None and lang[:2] in ARTICLES
+    cache = transform_cache(lang)
+    key = (mod, gendered, foreign, english)
+    value = cache.get(key)
+    counting = _counting(lang, kbase, mod)
+    if value is None:
+        if counting:
+            value, cache.traces[key] = _traced(lang, foreign, english, kbase, gendered, mod)
+        else:
+            value = _annotate(lang, foreign, english, kbase, gendered, mod)
+        cache.put(key, value)
+    elif counting:
+        if key in cache.traces:
+            _replay(lang, kbase, mod, cache.traces[key])
+        else:                                   # Memoised while stats were off, e.g. loaded from disk
+            cache.traces[key] = _traced(lang, foreign, english, kbase, gendered, mod)[1]
+    return value
+
+
+def _counting(lang, kbase, mod):
+    return getattr(getattr(kbase, 'stats', None), 'current', None) is not None or getattr(get_transformer(lang, mod), 'firings', None) is not None
+
+
+def _traced(lang, foreign, english, kbase, gendered, mod):
+    '''
+    `_annotate`, and `(counters, firings)` of what it counted.
+    '''
+    stats = getattr(kbase, 'stats', None)
+    transformer = get_transformer(lang, mod)
+    counters = stats.current if stats is not None else None
+    firings = getattr(transformer, 'firings', None)
+    if counters is not None:
+        stats.current = Counter()
+    if firings is not None:
+        transformer.firings = Counter()
+    try:
+        value = _annotate(lang, foreign, english, kbase, gendered, mod)
+        trace = (stats.current if counters is not None else Counter(), transformer.firings if firings is not None else Counter())
+    finally:
+        if counters is not None:
+            stats.current = counters
+        if firings is not None:
+            transformer.firings = firings
+    _replay(lang, kbase, mod, trace)
+    return value, trace
+
+
+def _replay(lang, kbase, mod, trace):
+    counters, firings = trace
+    stats = getattr(kbase, 'stats', None)
+    if stats is not None and stats.current is not None:
+        stats.current.update(counters)
+    transformer = get_transformer(lang, mod)
+    if getattr(transformer, 'firings', None) is not None:
+        transformer.firings.update(firings)
+
+
+def _annotate(lang, foreign, english, kbase, gendered, mod):
+    if gendered:
+        foreign = add_article(lang, foreign, kbase, mod)
+    transformer = get_transformer(lang, mod)
+    if transformer is not None:
+        foreign = transformer(foreign)
+    if lang.startswith('es_') or english != foreign:
+        return foreign + ' / ' + english.replace('%s', '●')
+    return english
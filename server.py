@@ -0,0 +1,235 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Local web service, so players on the LAN can look up crammese and download the pack without running the build themselves. Run it with `python3 main.py --serve`.
+
+Endpoints, all GET, answering JSON except for the pack:
+* `/lookup?lang=fr_fr&key=block.minecraft.oak_planks` or `/lookup?lang=fr_fr&english=Oak Planks`: the English, foreign and crammese text of the matching keys, and the grammatical gender of the first word.
+* `/search?q=planks&lang=fr_fr&lang=de_de&limit=20`: keys whose English or crammese text contains `q`, in every given language (default: all), at most `MAX_SEARCH_LIMIT`.
+* `/crammese.zip?lang=fr_fr&lang=ja_jp`: the pack with the given languages (default: all).
+
+Languages are built with the same incremental pipeline as `main.py`, at most once every `CHECK_INTERVAL` seconds, and the built lang files, their sources and the knowledge bases stay in memory. A language that fails to build keeps being served from its last good build, and answers 503 if it has none. Packs are kept in an LRU of `ARTIFACTS` zips keyed by the inputs of their languages, so concurrent downloads of the same pack are only zipped once.
+'''
+
+from collections import OrderedDict
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from json import dumps, loads
+from threading import Lock
+from time import monotonic, perf_counter
+from traceback import format_exc
+from urllib.parse import parse_qs, urlsplit
+
+from asset_index import object_path
+from build_manifest import BuildManifest, digest
+from knowledge_base import fold, open_knowledge_base
+from legacy_lang import legacy_pack_metadata, load_lang
+from main import (LANGUAGES_TO_BE_PATCHED, MC_HOME, MC_MODS, VERSION_TO_BE_PATCHED, best_locale, built_filename, instance_prefix,
+                  is_legacy, lang_filename, leapfrog, load_base, run_language)
+from mod_jars import ModJarIndex, prune
+from overlay import Overlay
+from pack_writer import pack_bytes
+
+HOST = '127.0.0.1'                              # '0.0.0.0' to serve the LAN
+PORT = 8787
+ARTIFACTS = 16
+CHECK_INTERVAL = 2.0
+SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 1000
+
+
+class PackService:
+    def __init__(self, instance=MC_MODS, version=VERSION_TO_BE_PATCHED, compact=False, persist_cache=False, maxsize=ARTIFACTS, lang_format=None):
+        self.instance = instance
+        self.version = version
+        self.legacy = is_legacy(version, lang_format)
+        self.compact = compact
+        self.persist_cache = persist_cache
+        self.maxsize = maxsize
+        self.lock = Lock()                      # Builds, and the memo of annotated values, aren't thread safe.
+        self.languages = {}                     # LANG -> resident data of its last build
+        self.artifacts = OrderedDict()          # ((LANG, token), ...) -> zip
+        self.checked = None
+
+    def refresh(self):
+        '''
+        Rebuilds the languages whose inputs changed, unless that was checked less than `CHECK_INTERVAL` seconds ago.
+        '''
+        with self.lock:
+            if self.checked is not None and monotonic() - self.checked < CHECK_INTERVAL:
+                return
+            manifest = BuildManifest()
+            base = load_base(leapfrog(self.version))
+            rebuilt = False
+            with ModJarIndex(f'{self.instance}/mods') as jars:
+                prune(jars.referenced())
+                for LANG in LANGUAGES_TO_BE_PATCHED:
+                    start = perf_counter()
+                    log = StringIO()
+                    with redirect_stdout(log):
+                        entry, data = run_language(LANG, jars, base, manifest, self.compact, None, self.persist_cache, self.instance, self.legacy)
+                    if entry is None:                   # Keep serving the last good build
+                        print(log.getvalue(), end='')
+                        continue
+                    token = digest(entry['inputs'])
+                    manifest.record(f'{instance_prefix(self.instance)}{LANG}', entry)
+                    if data is not None:
+                        rebuilt = True
+                        print(f'🔨 {LANG} rebuilt in {perf_counter() - start:.2f}s')
+                    if LANG not in self.languages or self.languages[LANG]['token'] != token:
+                        try:
+                            if data is None:
+                                data = open(built_filename(LANG, self.instance, self.legacy), 'rb').read()
+                            self.languages[LANG] = self._resident(LANG, jars, base, token, data)
+                        except Exception:
+                            print(f'⛔ {LANG} failed:\n{format_exc()}')
+                jars.save()
+            if rebuilt:
+                manifest.save()
+            self.checked = monotonic()
+
+    def _resident(self, LANG, jars, base, token, data):
+        hashes, en_us, version = base
+        english, foreign = [en_us], [load_lang(open(object_path(MC_HOME, hashes[LANG]), 'r', encoding='utf-8'))]
+        for mod, jar in jars.mods():
+            locale = best_locale(LANG, jars.locales(jar, mod))
+            if locale is None:
+                continue
+            try:
+                foreign.append(jars.read(jar, mod, locale, strip_comments=True))
+                english.append(jars.read(jar, mod, 'en_us'))
+            except Exception as e:
+                print(mod, ' ' * (30-len(mod)), f'❎ {e}')
+        return {'token': token, 'data': data, 'crammese': load_lang(StringIO(data.decode('utf-8'))), 'english': Overlay(english), 'foreign': Overlay(foreign),
+                'by_english': None}
+
+    def entry(self, LANG, key):
+        language = self.languages[LANG]
+        foreign = language['foreign'].get(key)
+        gender = None
+        kbase = open_knowledge_base(LANG)
+        if foreign and kbase is not None:
+            firstword = foreign.split(' ')[0]
+            gender = kbase.get(firstword.lower() if LANG.startswith('fr_') else firstword)
+        return {'key': key, 'lang': LANG, 'english': language['english'].get(key), 'foreign': foreign,
+                'crammese': language['crammese'].get(key), 'gender': gender}
+
+    def lookup(self, LANG, key=None, english=None):
+        self.refresh()
+        language = self.languages[LANG]
+        if key is not None:
+            keys = [key] if key in language['crammese'] else []
+        else:
+            if language['by_english'] is None:
+                by_english = {}
+                for k in language['english']:
+                    by_english.setdefault(fold(language['english'][k]), []).append(k)
+                language['by_english'] = by_english
+            keys = sorted(language['by_english'].get(fold(english), []))
+        return [self.entry(LANG, k) for k in keys]
+
+    def search(self, query, languages, limit=SEARCH_LIMIT):
+        self.refresh()
+        query = fold(query)
+        english = self.languages[languages[0]]['english']
+        results = []
+        for key in sorted(self.languages[languages[0]]['crammese']):
+            values = {LANG: self.languages[LANG]['crammese'].get(key) for LANG in languages}
+            if query in fold(english.get(key, '')) or any(value and query in fold(value) for value in values.values()):
+                results.append({'key': key, 'english': english.get(key), 'crammese': values})
+                if len(results) >= limit:
+                    break
+        return results
+
+    def pack(self, languages):
+        '''
+        Zip of the pack with the given languages, from the LRU if their inputs didn't change.
+        '''
+        self.refresh()
+        with self.lock:
+            key = tuple((LANG, self.languages[LANG]['token']) for LANG in languages)
+            if key in self.artifacts:
+                self.artifacts.move_to_end(key)
+                return self.artifacts[key]
+            mcmeta = loads(open('resourcepacks/crammese/pack.mcmeta', 'r', encoding='utf-8').read())
+            codes = {lang_filename(LANG).split('/')[-1].split('.')[0] for LANG in languages}
+            mcmeta['language'] = {code: language for code, language in mcmeta['language'].items() if code in codes}
+            mcmeta = dumps(mcmeta, indent=4, ensure_ascii=False).encode('utf-8')
+            members = {'pack.mcmeta': legacy_pack_metadata(mcmeta) if self.legacy else mcmeta}
+            for LANG in languages:
+                members[lang_filename(LANG, self.legacy)] = self.languages[LANG]['data']
+            self.artifacts[key] = pack_bytes(members)
+            if len(self.artifacts) > self.maxsize:
+                self.artifacts.popitem(last=False)
+            return self.artifacts[key]
+
+
+class Handler(BaseHTTPRequestHandler):
+    service = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        languages = query.get('lang') or list(LANGUAGES_TO_BE_PATCHED)
+        unknown = [LANG for LANG in languages if LANG not in LANGUAGES_TO_BE_PATCHED]
+        try:
+            if not unknown:
+                self.service.refresh()
+                if not query.get('lang'):           # Default to the languages that built
+                    languages = [LANG for LANG in languages if LANG in self.service.languages] or languages
+            unbuilt = [LANG for LANG in languages if LANG not in self.service.languages]
+            if unknown:
+                self.send_json({'error': f'unknown language {", ".join(unknown)}', 'languages': LANGUAGES_TO_BE_PATCHED}, 400)
+            elif unbuilt and url.path != '/':
+                self.send_json({'error': f'{", ".join(unbuilt)} failed to build, see the server log'}, 503)
+            elif url.path == '/':
+                self.send_json({'languages': LANGUAGES_TO_BE_PATCHED, 'endpoints': ['/lookup', '/search', '/crammese.zip']})
+            elif url.path == '/lookup':
+                if 'key' not in query and 'english' not in query:
+                    self.send_json({'error': 'key or english is required'}, 400)
+                else:
+                    self.send_json([entry for LANG in languages
+                                    for entry in self.service.lookup(LANG, query.get('key', [None])[0], query.get('english', [None])[0])])
+            elif url.path == '/search':
+                limit = query.get('limit', [str(SEARCH_LIMIT)])[0]
+                if not query.get('q'):
+                    self.send_json({'error': 'q is required'}, 400)
+                elif not limit.isdecimal() or int(limit) < 1:
+                    self.send_json({'error': 'limit must be a positive integer'}, 400)
+                else:
+                    self.send_json(self.service.search(query['q'][0], languages, min(int(limit), MAX_SEARCH_LIMIT)))
+            elif url.path == '/crammese.zip':
+                self.send(self.service.pack(languages), 'application/zip')
+            else:
+                self.send_json({'error': 'not found'}, 404)
+        except Exception:
+            print(f'⛔ {self.path} failed:\n{format_exc()}')
+            self.send_json({'error': 'build failed, see the server log'}, 500)
+
+    def send(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, content, status=200):
+        self.send(dumps(content, ensure_ascii=False, indent=2).encode('utf-8'), 'application/json; charset=utf-8', status)
+
+
+def serve(host=HOST, port=PORT, compact=False, persist_cache=False, lang_format=None):
+    Handler.service = PackService(compact=compact, persist_cache=persist_cache, lang_format=lang_format)
+    print('🔨 Building...')
+    Handler.service.refresh()
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f'🌐 Serving on http://{host}:{port}/, Ctrl+C to stop.')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    serve()
@@ -0,0 +1,10 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Tests import the build modules from the repository root, like `main.py` does.
+'''
+
+from os.path import abspath, dirname
+from sys import path
+
+path.insert(0, dirname(dirname(abspath(__file__))))
@@ -0,0 +1,35 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Genders of German compounds from their head noun.
+'''
+
+from german_compounds import CompoundKnowledgeBase, HeadNounTrie
+from rules import add_article
+
+WORDS = {'Blauer': 'm', 'Blaue': 'f', 'Grünes': 'n', 'Blume': 'f', 'Brett': 'n', 'Eiche': 'f', 'Holz': 'n', 'Kreuz': 'n', 'Tisch': 'm', 'Arbeit': 'f'}
+
+
+def test_compounds_of_known_words():
+    trie = HeadNounTrie(WORDS.items())
+    assert trie.gender('Eichenholzbrett') == 'n'
+    assert trie.gender('Holzbrett') == 'n'
+    assert trie.gender('Arbeitstisch') == 'm'
+    assert trie.gender('Blaukreuz') == 'n'      # Adjectives are modifiers too
+
+
+def test_unknown_modifiers_are_not_split():
+    trie = HeadNounTrie(WORDS.items())
+    assert trie.gender('Spickelbrett') is None
+    assert trie.gender('Andreaskreuz') is None
+
+
+def test_inflected_adjectives_are_not_compounds():
+    kbase = CompoundKnowledgeBase(WORDS)
+    assert kbase.get('Hellblauer') is None
+    assert kbase.get('Hellblaue') is None
+    assert kbase.get('Hellgrünes') is None
+    assert add_article('de_de', 'Hellblauer Spickelbord', kbase) == 'Hellblauer Spickelbord'
+    assert add_article('de_de', 'Hellblaue Blume', kbase) == 'Hellblaue Blume'
+    assert add_article('de_de', 'Hellgrünes Andreaskreuz', kbase) == 'Hellgrünes Andreaskreuz'
+    assert add_article('de_de', 'Eichenholzbrett', kbase) == 'Das Eichenholzbrett'
@@ -0,0 +1,21 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Categories and namespaces of modern and legacy lang keys.
+'''
+
+from key_categories import classify
+
+
+def test_modern_keys():
+    assert classify('block.minecraft.oak_planks') == ('block', 'minecraft')
+    assert classify('item.cfm.sofa') == ('item', 'cfm')
+    assert classify('item.cfm.sofa.name') == ('item', 'cfm')
+    assert classify('container.chest') == ('container', None)
+
+
+def test_legacy_keys():
+    assert classify('tile.stone.name') == ('block', 'minecraft')
+    assert classify('item.apple.name') == ('item', 'minecraft')
+    assert classify('tile.ironchest:IRON.name') == ('block', 'ironchest')
+    assert classify('item.ironchest:upgrade.name') == ('item', 'ironchest')
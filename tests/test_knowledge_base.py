@@ -0,0 +1,21 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Lookups in the knowledge base: exact, case-folded and plural.
+'''
+
+from knowledge_base import KnowledgeBase, write_knowledge_base
+
+
+def test_folded_lookups_keep_accents(tmp_path):
+    path = str(tmp_path / 'mc_fr_fr.kb')
+    write_knowledge_base(path, {'thé': 'm', 'chêne': 'm', 'épée': 'f'}, 'fr_fr')
+    kbase = KnowledgeBase(path)
+    assert kbase.get('thé') == 'm'
+    assert kbase.get('THÉ') == 'm'
+    assert kbase.get('Épée') == 'f'
+    assert kbase.get('chênes') == 'p'
+    assert kbase.get('The') is None             # English left untranslated
+    assert kbase.get('the') is None
+    assert kbase.get('Epee') is None
+    kbase.close()
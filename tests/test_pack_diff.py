@@ -0,0 +1,30 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Key-level diffs between two builds, counted by namespace.
+'''
+
+from json import dumps
+
+from pack_diff import diff_packs
+
+NAME = 'assets/minecraft/lang/cm_fr.json'
+
+
+def pack(values):
+    return {NAME: dumps(values).encode('utf-8')}
+
+
+def test_keys_of_a_mod_are_counted_under_its_namespace():
+    old = pack({'block.minecraft.stone': 'Pierre / Stone'})
+    new = pack({'block.minecraft.stone': 'Pierre / Stone', 'item.newmod.gear': 'Engrenage / Gear', 'gui.newmod.title': 'Titre / Title',
+                'config.newmod.speed': 'Vitesse / Speed', 'newmod.tooltip': 'Astuce / Tip', 'gui.done': 'Fini / Done'})
+    report = diff_packs(old, new, {'newmod'})[NAME]
+    assert report['added'] == 5
+    assert {ns: counts['added'] for ns, counts in report['by_namespace'].items()} == {'newmod': 4, 'minecraft': 1}
+
+
+def test_namespaces_are_guessed_from_item_keys():
+    new = pack({'item.newmod.gear': 'Engrenage / Gear', 'tooltip.newmod.gear': 'Astuce / Tip', 'jade.title': 'Jade / Jade'})
+    report = diff_packs({}, new)[NAME]
+    assert {ns: counts['added'] for ns, counts in report['by_namespace'].items()} == {'newmod': 2, 'minecraft': 1}
@@ -0,0 +1,51 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+The hand-written pack zip: readable by `zipfile`, unchanged members copied as they are, stale members dropped.
+'''
+
+from zipfile import ZipFile
+
+from pack_writer import _previous_entries, pack_bytes, write_pack_zip
+
+FR, DE = 'assets/minecraft/lang/cm_fr.json', 'assets/minecraft/lang/cm_de.json'
+
+
+def read(path):
+    with ZipFile(path) as z:
+        assert z.testzip() is None
+        return {name: z.read(name) for name in z.namelist()}
+
+
+def test_rewrite_copies_unchanged_members(tmp_path):
+    path = str(tmp_path / 'crammese.zip')
+    members = {'pack.mcmeta': b'{"pack": {}}', FR: b'{"a": "Pierre / Stone"}' * 50, DE: '{"a": "Der Stein / Stone"}'.encode('utf-8')}
+    assert write_pack_zip(path, members)
+    assert read(path) == members
+    before = _previous_entries(path)
+
+    changed = dict(members, **{DE: '{"a": "Der Stein / Stone", "b": "Größe / Size"}'.encode('utf-8')})
+    assert write_pack_zip(path, changed)
+    assert read(path) == changed
+    after = _previous_entries(path)
+    assert after[FR] == before[FR]              # Same compressed bytes
+    assert after[DE] != before[DE]
+    assert not write_pack_zip(path, changed)
+
+
+def test_stale_members_are_dropped(tmp_path):
+    path = str(tmp_path / 'crammese.zip')
+    write_pack_zip(path, {'pack.mcmeta': b'{}', FR: b'{}', DE: b'{}'})
+    legacy = 'assets/minecraft/lang/cm_fr.lang'
+    write_pack_zip(path, {'pack.mcmeta': b'{}', legacy: b'a=b\n'}, {legacy, 'assets/minecraft/lang/cm_de.lang'})
+    assert read(path) == {'pack.mcmeta': b'{}', legacy: b'a=b\n'}
+    write_pack_zip(path, {'pack.mcmeta': b'{}'}, {legacy})
+    assert read(path) == {'pack.mcmeta': b'{}', legacy: b'a=b\n'}           # Kept, e.g. when its language failed to build
+
+
+def test_pack_bytes_is_deterministic(tmp_path):
+    members = {FR: b'{"a": "b"}', 'pack.mcmeta': b'{}'}
+    assert pack_bytes(members) == pack_bytes(dict(reversed(members.items())))
+    path = tmp_path / 'crammese.zip'
+    path.write_bytes(pack_bytes(members))
+    assert read(str(path)) == members
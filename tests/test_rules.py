@@ -0,0 +1,51 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+The one-scan transformers give what the chained rules gave, and memoised values count like computed ones.
+'''
+
+from random import Random
+
+from build_stats import BuildStats
+from rules import FRENCH_MOD_RULES, FRENCH_RULES, SPANISH_RULES, Transformer, _literal, annotate, chain, overlaps
+from transform_cache import transform_cache
+
+TABLES = {'es': SPANISH_RULES, 'fr': FRENCH_RULES, 'fr mod': FRENCH_MOD_RULES}
+
+
+def test_overlapping_rules():
+    transformer = Transformer(FRENCH_MOD_RULES)
+    assert transformer('Block de vérification') == 'Bloc à damiers'
+    assert transformer('Block de vérification') == chain(FRENCH_MOD_RULES, 'Block de vérification')
+    assert Transformer(SPANISH_RULES)('Diferenciando') == chain(SPANISH_RULES, 'Diferenciando')
+
+
+def test_overlaps_match_the_chain():
+    for name, rules in TABLES.items():
+        transformer = Transformer(rules)
+        for text in overlaps(rules):
+            for value in (text, f'x {text} y', f'{text}{text}'):
+                assert transformer(value) == chain(rules, value), (name, value)
+
+
+def test_random_strings_match_the_chain():
+    random = Random(0)
+    for name, rules in TABLES.items():
+        transformer = Transformer(rules)
+        pieces = [literal for literal in (_literal(pattern) for pattern, _ in rules) if literal is not None] + list('hHvVcsp ')
+        for _ in range(2000):
+            value = ''.join(random.choice(pieces) for _ in range(random.randint(1, 6)))
+            assert transformer(value) == chain(rules, value), (name, value)
+
+
+def test_memo_hits_are_counted():
+    transform_cache('fr_fr').validate('test')
+    stats = BuildStats(True)
+    kbase = stats.knowledge_base({'hache': 'f'})
+    for mod in ('first', 'second'):
+        with stats.measure('fr_fr', mod):
+            assert annotate('fr_fr', 'hache en bois', 'Wooden Axe', kbase, gendered=True) == 'Une <h>ache en bois / Wooden Axe'
+    first, second = (stats.languages['fr_fr']['mods'][mod] for mod in ('first', 'second'))
+    assert transform_cache('fr_fr').hits == 1
+    assert first['kb_hits'] == second['kb_hits'] == 1
+    assert first['rules'] == second['rules'] != {}
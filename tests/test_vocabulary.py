@@ -0,0 +1,17 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Words and bigrams of translated values.
+'''
+
+from vocabulary import tokens
+
+
+def test_words_and_bigrams():
+    assert tokens('fr_fr', 'Planches de %s chêne') == ['planches', 'de', 'chêne', 'planches de', 'de chêne']
+    assert tokens('de_de', 'Eichenholz-Bretter') == ['Eichenholz-Bretter']
+
+
+def test_japanese_is_split_into_words():
+    assert tokens('ja_jp', '丸石の塀') == ['丸石', 'の', '塀', '丸石 の', 'の 塀']
+    assert tokens('ja_jp', '赤いネザーレンガ (%s)') == ['赤い', 'ネザーレンガ', '赤い ネザーレンガ']
@@ -0,0 +1,81 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Memo of annotated values per language. Vanilla and mods repeat the same values over and over (wood variants, colours, `container.*` titles), so each distinct `(foreign, English)` pair is only run through the article lookup and the rewrite rules once, and repeated keys share one string.
+
+The memo is an LRU capped at `MAXSIZE` entries. It is only valid for one version of the rules and of the knowledge base, so it's cleared whenever those change, and it can be saved to `knowledgebase/.cache` to be reused by the next run.
+'''
+
+from collections import OrderedDict
+from functools import lru_cache
+from json import dumps, loads
+from os import makedirs
+from os.path import exists
+
+from build_manifest import write_atomic
+
+CACHE_DIR = 'knowledgebase/.cache'
+MAXSIZE = 200000
+
+
+class TransformCache:
+    def __init__(self, LANG, maxsize=MAXSIZE):
+        self.path = f'{CACHE_DIR}/transform_{LANG}.json'
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.traces = {}                        # key -> what computing its value counted, while stats are collected, see `rules.annotate`
+        self.token = None
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        self.persistent = False
+        self.loaded = False
+
+    def validate(self, token, persistent=False):
+        '''
+        Clears the memo if it was filled with other rules or another knowledge base, and resets the hit rate. A persistent memo is loaded from disk the first time.
+        '''
+        self.persistent = persistent
+        if persistent and not self.loaded:
+            self.loaded = True
+            if exists(self.path):
+                saved = loads(open(self.path, 'r', encoding='utf-8').read())
+                if saved['token'] == token:
+                    self.token = token
+                    self.entries = OrderedDict((tuple(key), value) for key, value in saved['entries'])
+        if token != self.token:
+            self.entries.clear()
+            self.traces.clear()
+            self.token = token
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.dirty = True
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+    def save(self):
+        if not self.persistent or not self.dirty:
+            return
+        makedirs(CACHE_DIR, exist_ok=True)
+        write_atomic(self.path, dumps({'token': self.token, 'entries': [[list(key), value] for key, value in self.entries.items()]}, ensure_ascii=False))
+        self.dirty = False
+
+
+@lru_cache(maxsize=None)
+def transform_cache(LANG):
+    return TransformCache(LANG)
@@ -0,0 +1,290 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Vocabulary index of a language: every word and bigram of the translated strings of the game and of the mods, how often it occurs, the keys it occurs in and its gender in the knowledge base. Japanese, written without spaces, is split into words by pykakasi if it is installed, see `japanese.py`. It tells which unknown nouns are worth looking up first (`optional_grammatical_gender.py --frequent`), and which vocabulary is worth cramming.
+
+The index is kept in `knowledgebase/.cache/vocabulary` and updated incrementally: the tokens of each lang file are cached by the signature of the file, so only lang files that changed are tokenised again. The index itself is a memory-mapped file of arrays:
+* the keys, and the tokens, as sorted string tables that are binary-searched in place,
+* the count and the gender of each token,
+* the keys of each token, as offsets into one array of key numbers, and
+* the tokens by count, most frequent first.
+
+Usage: python3 vocabulary.py fr_fr [--top 50] [--unknown] [--words] [--keys 3]
+'''
+
+from argparse import ArgumentParser
+from functools import partial
+from json import dumps, loads
+from mmap import ACCESS_READ, mmap
+from os import makedirs, replace
+from os.path import basename, dirname, exists
+from re import compile
+from struct import Struct
+
+from asset_index import object_path
+from build_manifest import digest, file_signature, write_atomic
+from knowledge_base import knowledge_base_path, open_knowledge_base
+from legacy_lang import load_lang
+from rules import get_transformer
+
+VOCABULARY_DIR = 'knowledgebase/.cache/vocabulary'
+MAGIC = b'MCVI'
+FORMAT_VERSION = 2
+HEADER = Struct('<4sHH8s20s')                   # magic, format version, reserved, language, digest of the sources and the knowledge base
+TABLE_HEADER = Struct('<II')                    # number of strings, size of the string blob
+UINT = Struct('<I')
+OFFSET_PAIR = Struct('<II')
+NO_GENDER = '-'
+
+FORMAT_CODES = compile(r'%(?:\d+\$)?[a-zA-Z%]|§.|\{[^}]*\}')    # `%s`, `%1$s`, colour codes and placeholders aren't words
+WORD = compile(r"[^\W\d_]+(?:-[^\W\d_]+)*")
+
+
+def vocabulary_path(name):
+    '''
+    Index of a language, `name` being its entry in the build manifest, e.g. `fr_fr` or `1.12.2/fr_fr`.
+    '''
+    return f'{VOCABULARY_DIR}/{name}.idx'
+
+
+def tokens(LANG, value):
+    '''
+    Words and bigrams of a translated value. Words are lowercased, except in German where nouns are capitalised.
+    '''
+    if not LANG.startswith('de_'):
+        value = value.lower()
+    value = FORMAT_CODES.sub(' ', value)
+    readings = get_transformer(LANG) if LANG.startswith('ja_') else None
+    if readings is not None:
+        value = readings.segment(value)
+    words = WORD.findall(value)
+    return words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+
+
+def tokenise(LANG, trans):
+    '''
+    `{'keys': [key, ...], 'tokens': {token: [count, key number, ...]}}` of a lang file.
+    '''
+    keys = sorted(trans)
+    out = {}
+    for i, key in enumerate(keys):
+        value = trans[key]
+        if not isinstance(value, str):
+            continue
+        for token in tokens(LANG, value):
+            posting = out.setdefault(token, [0])
+            posting[0] += 1
+            if len(posting) == 1 or posting[-1] != i:
+                posting.append(i)
+    return {'keys': keys, 'tokens': out}
+
+
+def translation_sources(jars, home, hash, locales):
+    '''
+    `(name, signature, loader)` of the vanilla lang file, asset `hash`, and of the lang file of every mod, `locales` being `{mod: locale or None}`.
+    '''
+    sources = [('minecraft', [hash], lambda: load_lang(open(object_path(home, hash), 'r', encoding='utf-8')))]
+    for mod, jar in jars.mods():
+        locale = locales.get(mod)
+        if locale is not None:
+            sources.append((mod, [basename(jar), locale] + jars.signature(jar, mod, locale), partial(jars.read, jar, mod, locale, strip_comments=True)))
+    return sources
+
+##################################################
+#    Reading
+##################################################
+class _Strings:
+    def __init__(self, mm, offset):
+        self.mm = mm
+        self.count, blob_size = TABLE_HEADER.unpack_from(mm, offset)
+        self.offsets = offset + TABLE_HEADER.size
+        self.blob = self.offsets + 4 * (self.count + 1)
+        self.end = _align(self.blob + blob_size)
+
+    def string(self, i):
+        start, end = OFFSET_PAIR.unpack_from(self.mm, self.offsets + 4 * i)
+        return self.mm[self.blob + start:self.blob + end]
+
+    def find(self, string):
+        key = string.encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.string(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self.string(lo) == key:
+            return lo
+        return None
+
+
+class VocabularyIndex:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mm = mmap(f.fileno(), 0, access=ACCESS_READ)
+        magic, version, _, lang, self.token = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'⛔ {path} is not a vocabulary index of format version {FORMAT_VERSION}.')
+        self.lang = lang.rstrip(b'\0').decode('ascii')
+        self.keys = _Strings(self.mm, HEADER.size)
+        self.tokens = _Strings(self.mm, self.keys.end)
+        n = self.tokens.count
+        self.counts = self.tokens.end
+        self.ranks = self.counts + 4 * n
+        self.postings = self.ranks + 4 * n
+        self.key_numbers = self.postings + 4 * (n + 1)
+        self.genders = self.key_numbers + 4 * UINT.unpack_from(self.mm, self.postings + 4 * n)[0]
+
+    def _count(self, i):
+        return UINT.unpack_from(self.mm, self.counts + 4 * i)[0]
+
+    def _gender(self, i):
+        gender = chr(self.mm[self.genders + i])
+        return None if gender == NO_GENDER else gender
+
+    def count(self, token):
+        '''
+        How often the token occurs, 0 if it doesn't.
+        '''
+        i = self.tokens.find(token)
+        return 0 if i is None else self._count(i)
+
+    def gender(self, token):
+        i = self.tokens.find(token)
+        return None if i is None else self._gender(i)
+
+    def keys_of(self, token):
+        '''
+        Keys whose value contains the token, sorted.
+        '''
+        i = self.tokens.find(token)
+        if i is None:
+            return []
+        start, end = OFFSET_PAIR.unpack_from(self.mm, self.postings + 4 * i)
+        return [self.keys.string(UINT.unpack_from(self.mm, self.key_numbers + 4 * j)[0]).decode('utf-8') for j in range(start, end)]
+
+    def most_common(self, unknown=False, bigrams=True):
+        '''
+        `(token, count, gender)` from the most frequent token, only tokens without a gender if `unknown`, only words unless `bigrams`.
+        '''
+        for r in range(self.tokens.count):
+            i = UINT.unpack_from(self.mm, self.ranks + 4 * r)[0]
+            token = self.tokens.string(i).decode('utf-8')
+            gender = self._gender(i)
+            if (unknown and gender is not None) or (not bigrams and ' ' in token):
+                continue
+            yield token, self._count(i), gender
+
+    def __contains__(self, token):
+        return self.tokens.find(token) is not None
+
+    def __len__(self):
+        return self.tokens.count
+
+    def close(self):
+        self.mm.close()
+
+##################################################
+#    Writing
+##################################################
+def _align(n):
+    return (n + 3) & ~3
+
+
+def _pack(fmt, values):
+    return Struct(f'<{len(values)}{fmt}').pack(*values)
+
+
+def _pack_strings(strings):
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = [0]
+    for string in encoded:
+        offsets.append(offsets[-1] + len(string))
+    table = TABLE_HEADER.pack(len(encoded), offsets[-1]) + _pack('I', offsets) + b''.join(encoded)
+    return table + b'\0' * (_align(len(table)) - len(table))
+
+
+def write_vocabulary(path, LANG, sources, kbase, token):
+    '''
+    Merges the tokenised lang files, `{name: tokenise(...)}`, into an index at `path`. Bigrams get no gender.
+    '''
+    keys = sorted({key for source in sources.values() for key in source['keys']})
+    numbers = {key: i for i, key in enumerate(keys)}
+    merged = {}
+    for source in sources.values():
+        for t, (count, *positions) in source['tokens'].items():
+            entry = merged.setdefault(t, [0, set()])
+            entry[0] += count
+            entry[1].update(numbers[source['keys'][i]] for i in positions)
+    words = sorted(merged)                      # Same order as their UTF-8 bytes
+    postings, key_numbers = [0], []
+    for t in words:
+        key_numbers += sorted(merged[t][1])
+        postings.append(len(key_numbers))
+    counts = [merged[t][0] for t in words]
+    ranks = sorted(range(len(words)), key=lambda i: (-counts[i], words[i]))
+    genders = ''.join((kbase.get(t.split('-')[-1] if LANG.startswith('de_') else t) if kbase is not None and ' ' not in t else None) or NO_GENDER
+                      for t in words).encode('ascii')
+
+    makedirs(dirname(path), exist_ok=True)
+    with open(f'{path}.tmp', 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, LANG.encode('ascii'), token))
+        f.write(_pack_strings(keys))
+        f.write(_pack_strings(words))
+        f.write(_pack('I', counts) + _pack('I', ranks) + _pack('I', postings) + _pack('I', key_numbers) + genders)
+    replace(f'{path}.tmp', path)
+
+
+def update_vocabulary(name, LANG, sources):
+    '''
+    Brings the index of a language up to date with its lang files, `translation_sources(...)`, and returns it opened. Only lang files whose signature changed are read and tokenised again.
+    '''
+    path = vocabulary_path(name)
+    token = bytes.fromhex(digest({'sources': {source: signature for source, signature, _ in sources},
+                                  'knowledgebase': file_signature(knowledge_base_path(LANG)), 'format': FORMAT_VERSION}))
+    if exists(path):
+        with open(path, 'rb') as f:
+            if f.read(HEADER.size) == HEADER.pack(MAGIC, FORMAT_VERSION, 0, LANG.encode('ascii'), token):
+                return VocabularyIndex(path)
+
+    cache_path = f'{path[:-len(".idx")]}.json'
+    cached = loads(open(cache_path, 'r', encoding='utf-8').read()) if exists(cache_path) else {}
+    tokenised = {}
+    for source, signature, load in sources:
+        if source in cached and cached[source]['signature'] == signature and cached[source].get('format') == FORMAT_VERSION:
+            tokenised[source] = cached[source]
+            continue
+        try:
+            tokenised[source] = dict(tokenise(LANG, load()), signature=signature, format=FORMAT_VERSION)
+        except Exception as e:
+            print(source, ' ' * (30-len(source)), f'❎ {e}')
+    changed = len([source for source in tokenised if tokenised[source] is not cached.get(source)])
+    if LANG.startswith('ja_') and get_transformer(LANG) is not None:
+        get_transformer(LANG).save()
+    makedirs(dirname(cache_path), exist_ok=True)
+    write_atomic(cache_path, dumps(tokenised, ensure_ascii=False, separators=(',', ':')))
+    write_vocabulary(path, LANG, tokenised, open_knowledge_base(LANG), token)
+    vocabulary = VocabularyIndex(path)
+    print(f'📚 {name}: {len(vocabulary)} words and bigrams, {changed} of {len(sources)} lang files tokenised.')
+    return vocabulary
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('name', help='language, e.g. fr_fr, or 1.12.2/fr_fr for another instance')
+    parser.add_argument('--top', type=int, default=50, help='tokens listed')
+    parser.add_argument('--unknown', action='store_true', help='only list words the knowledge base has no gender for')
+    parser.add_argument('--words', action='store_true', help='leave out bigrams')
+    parser.add_argument('--keys', type=int, default=0, help='keys listed per token')
+    args = parser.parse_args()
+
+    if not exists(vocabulary_path(args.name)):
+        raise SystemExit(f'⛔ No vocabulary index for {args.name}, build with python3 main.py --vocabulary first.')
+    vocabulary = VocabularyIndex(vocabulary_path(args.name))
+    for n, (token, count, gender) in enumerate(vocabulary.most_common(args.unknown, not args.words and not args.unknown)):
+        if n >= args.top:
+            break
+        keys = vocabulary.keys_of(token)
+        shown = ', '.join(keys[:args.keys]) + (f', ... {len(keys) - args.keys} more' if len(keys) > args.keys else '') if args.keys else f'{len(keys)} keys'
+        print(f'{count:7} {gender or NO_GENDER} {token}  ({shown})')
+    vocabulary.close()
@@ -0,0 +1,132 @@
+'''
+Copyleft Alexander Poone 2024 Edutainment.
+
+Watches folders for changed files, for `main.py --watch`. Uses inotify on Linux, and polls file mtimes elsewhere.
+
+Changes come in bursts (a jar being copied, a knowledge base being rewritten), so `wait` returns once the folders have been quiet for `DEBOUNCE` seconds. Hidden files and `*.tmp` files are ignored, e.g. the caches written by the build itself.
+'''
+
+from ctypes import CDLL, get_errno
+from ctypes.util import find_library
+from os import close, listdir, read, stat
+from os.path import exists, isfile
+from select import select
+from struct import Struct
+from sys import platform
+from time import monotonic, sleep
+
+DEBOUNCE = 0.3
+POLL_INTERVAL = 0.5
+
+IN_ATTRIB, IN_CLOSE_WRITE = 0x004, 0x008
+IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x040, 0x080, 0x100, 0x200
+IN_NONBLOCK, IN_CLOEXEC = 0o4000, 0o2000000
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT = Struct('iIII')                          # wd, mask, cookie, name length
+
+
+def ignored(name):
+    return name.startswith('.') or name.endswith('.tmp')
+
+
+class PollingWatcher:
+    def __init__(self, folders):
+        self.folders = [folder for folder in folders if exists(folder)]
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        files = {}
+        for folder in self.folders:
+            try:
+                names = listdir(folder)
+            except OSError:                     # Folder removed, e.g. an instance being reinstalled
+                continue
+            for name in names:
+                path = f'{folder}/{name}'
+                try:
+                    if not ignored(name) and isfile(path):
+                        st = stat(path)
+                        files[path] = (st.st_mtime_ns, st.st_size)
+                except OSError:                 # Deleted or replaced since `listdir`, the next scan sees what it became
+                    pass
+        return files
+
+    def _changes(self, timeout):
+        deadline = monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = {path for path in snapshot.keys() | self.snapshot.keys() if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changed or monotonic() >= deadline:
+                return changed
+            sleep(min(POLL_INTERVAL, max(deadline - monotonic(), 0)))
+
+    def wait(self):
+        '''
+        Blocks until files changed, and returns their paths.
+        '''
+        changed = self._changes(float('inf'))
+        while True:
+            more = self._changes(max(DEBOUNCE, POLL_INTERVAL))
+            if not more:
+                return changed
+            changed |= more
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    def __init__(self, folders):
+        self.libc = CDLL(find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(get_errno(), 'inotify_init1 failed')
+        self.folders = {}
+        for folder in folders:
+            if exists(folder):
+                wd = self.libc.inotify_add_watch(self.fd, folder.encode(), WATCH_MASK)
+                if wd < 0:
+                    raise OSError(get_errno(), f'inotify_add_watch failed for {folder}')
+                self.folders[wd] = folder
+
+    def _changes(self, timeout):
+        readable, _, _ = select([self.fd], [], [], timeout)
+        changed = set()
+        if not readable:
+            return changed
+        try:
+            data = read(self.fd, 65536)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+            if name and not ignored(name) and wd in self.folders:
+                changed.add(f'{self.folders[wd]}/{name}')
+        return changed
+
+    def wait(self):
+        changed = set()
+        while not changed:
+            changed = self._changes(None)
+        while True:
+            more = self._changes(DEBOUNCE)
+            if not more:
+                return changed
+            changed |= more
+
+    def close(self):
+        close(self.fd)
+
+
+def open_watcher(folders):
+    if platform.startswith('linux'):
+        try:
+            return InotifyWatcher(folders)
+        except (OSError, AttributeError) as e:
+            print('⚠️ inotify not available, polling instead:', e)
+    return PollingWatcher(folders)